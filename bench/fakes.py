@@ -0,0 +1,202 @@
+"""
+Локальные заменители внешних сервисов для бенчмарка:
+- FakeTelegram  — Bot API (любой метод отвечает правдоподобным объектом);
+- FakeQuranApi  — quranapi.pages.dev + api.alquran.cloud + сами mp3;
+- FakeUploaderClient — вместо Pyrogram-сессии: вычитывает источник и
+  «загружает» его с заданной пропускной способностью.
+Задержки настраиваются, чтобы отделять стоимость бота от стоимости сети.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from itertools import count
+from types import SimpleNamespace
+from uuid import uuid4
+
+from aiohttp import web
+
+from services.quran_meta import AYAH_COUNTS, MAX_SURAH, ayah_count
+from services.uploader import PART_SIZE, StreamSource
+
+RECITER_IDS = ("1", "2", "3", "4", "5")
+
+# Несколько настоящих названий — чтобы inline-поиск по именам было что искать
+SURAH_NAMES = {
+    1:   ("Al-Fatiha", "الفاتحة", "The Opener"),
+    2:   ("Al-Baqarah", "البقرة", "The Cow"),
+    18:  ("Al-Kahf", "الكهف", "The Cave"),
+    36:  ("Ya-Sin", "يس", "Ya Sin"),
+    55:  ("Ar-Rahman", "الرحمن", "The Beneficent"),
+    67:  ("Al-Mulk", "الملك", "The Sovereignty"),
+    112: ("Al-Ikhlas", "الإخلاص", "The Sincerity"),
+}
+
+
+async def serve(app: web.Application) -> tuple[web.AppRunner, str]:
+    """Запускает приложение на свободном порту 127.0.0.1, возвращает базовый URL."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+class FakeTelegram:
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self._ids = count(1)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        return app
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        form = await request.post()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"ok": True, "result": self._result(method.lower(), form)})
+
+    def _message(self, form, **extra) -> dict:
+        try:
+            chat_id = int(form.get("chat_id", 0))
+        except ValueError:
+            chat_id = 0
+        return {
+            "message_id": next(self._ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            **extra,
+        }
+
+    def _result(self, method: str, form):
+        if method == "getme":
+            return {"id": 1, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        if method == "copymessage":
+            return {"message_id": next(self._ids)}
+        if method == "sendaudio":
+            return self._message(form, audio={
+                "file_id": str(form.get("audio", "")), "file_unique_id": uuid4().hex, "duration": 1,
+            })
+        if method == "sendmediagroup":
+            media = json.loads(form.get("media", "[]"))
+            return [
+                self._message(form, audio={
+                    "file_id": str(m.get("media", "")), "file_unique_id": uuid4().hex, "duration": 1,
+                })
+                for m in media
+            ]
+        if method in ("sendmessage", "editmessagetext", "senddocument"):
+            return self._message(form, text=str(form.get("text", "")))
+        return True
+
+
+class FakeQuranApi:
+    def __init__(self, audio_size: int = 256 * 1024, latency: float = 0.0) -> None:
+        self.audio_size = audio_size
+        self.latency    = latency
+        self.requests   = 0
+        self.base       = ""   # заполняется после запуска сервера
+        self._audio     = os.urandom(audio_size)
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._count])
+        r = app.router
+        r.add_get("/api/audio/{s}.json", self._audio_surah)
+        r.add_get("/api/audio/{s}/{a}.json", self._audio_ayah)
+        r.add_get("/api/{s}.json", self._surah)
+        r.add_get("/api/{s}/{a}.json", self._ayah)
+        r.add_get("/mp3/{tail:.*}", self._mp3)
+        r.add_get("/v1/ayah/{ref}/{edition}", self._translation)
+        r.add_get("/v1/quran/{edition}", self._edition)
+        return app
+
+    @web.middleware
+    async def _count(self, request: web.Request, handler):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    def _names(self, s: int) -> tuple[str, str, str]:
+        return SURAH_NAMES.get(s, (f"Surah-{s}", f"سورة {s}", f"Chapter {s}"))
+
+    def _audio_links(self, path: str) -> dict:
+        return {
+            rid: {"reciter": f"Reciter {rid}", "url": f"{self.base}/mp3/{rid}/{path}.mp3"}
+            for rid in RECITER_IDS
+        }
+
+    async def _audio_surah(self, request: web.Request) -> web.Response:
+        return web.json_response(self._audio_links(request.match_info["s"]))
+
+    async def _audio_ayah(self, request: web.Request) -> web.Response:
+        s, a = request.match_info["s"], request.match_info["a"]
+        return web.json_response(self._audio_links(f"{s}-{a}"))
+
+    async def _surah(self, request: web.Request) -> web.Response:
+        s = int(request.match_info["s"])
+        if not 1 <= s <= MAX_SURAH:
+            raise web.HTTPNotFound()
+        name, arabic, translation = self._names(s)
+        return web.json_response({
+            "surahName": name, "surahNameArabic": arabic,
+            "surahNameTranslation": translation, "totalAyah": ayah_count(s),
+            "arabic1": [f"آية {a}" for a in range(1, ayah_count(s) + 1)],
+            "audio": self._audio_links(str(s)),
+        })
+
+    async def _ayah(self, request: web.Request) -> web.Response:
+        s, a = int(request.match_info["s"]), int(request.match_info["a"])
+        name, arabic, translation = self._names(s)
+        return web.json_response({
+            "surahName": name, "surahNameArabic": arabic,
+            "surahNameTranslation": translation, "totalAyah": ayah_count(s),
+            "arabic1": f"آية {a}",
+            "audio": self._audio_links(f"{s}-{a}"),
+        })
+
+    async def _mp3(self, request: web.Request) -> web.Response:
+        return web.Response(body=self._audio, content_type="audio/mpeg")
+
+    async def _translation(self, request: web.Request) -> web.Response:
+        ref = request.match_info["ref"]
+        return web.json_response({"data": {"text": f"Перевод {ref}"}})
+
+    async def _edition(self, request: web.Request) -> web.Response:
+        edition = request.match_info["edition"]
+        return web.json_response({"data": {"surahs": [
+            {"number": s, "ayahs": [
+                {"numberInSurah": a, "text": f"{edition} {s}:{a}"} for a in range(1, n + 1)
+            ]}
+            for s, n in enumerate(AYAH_COUNTS, start=1)
+        ]}})
+
+
+class FakeUploaderClient:
+    """Подменяет Pyrogram-клиент в пуле uploader: send_audio вычитывает
+    источник (поток или файл) и ждёт, сколько заняла бы загрузка."""
+
+    is_connected = False
+
+    def __init__(self, bytes_per_sec: float = 20 * 1024 * 1024, rtt: float = 0.05) -> None:
+        self.bytes_per_sec = bytes_per_sec
+        self.rtt           = rtt
+        self.uploads       = 0
+
+    async def send_audio(self, chat_id, audio, **kwargs) -> SimpleNamespace:
+        if isinstance(audio, StreamSource):
+            size = 0
+            async for chunk in audio.response.content.iter_chunked(PART_SIZE):
+                size += len(chunk)
+        else:
+            size = os.path.getsize(audio)
+        await asyncio.sleep(self.rtt + size / self.bytes_per_sec)
+        self.uploads += 1
+        return SimpleNamespace(audio=SimpleNamespace(file_id=f"bench-{uuid4().hex}"))
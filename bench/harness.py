@@ -0,0 +1,216 @@
+"""
+Стенд: настоящий диспетчер бота (create_dispatcher), настоящая БД и очередь
+загрузок, а Telegram, Quran API и MTProto-сессии — локальные заменители из
+bench/fakes.py. Обновления подаются через dp.feed_raw_update, как их подал бы
+webhook, и для каждого замеряется время обработки.
+Импортировать только после того, как bench/run.py выставил окружение.
+"""
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Iterable
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import ParseMode
+
+import metrics
+from bot import create_dispatcher
+from config import BOT_TOKEN
+from database.db import init_db, close_db, get_db
+from database.models import audio_cache, user_cache, invalidate_reciters
+from services import blocked, jobs, prefetch, quran_api, quran_import, uploader
+from services.http import close_session
+from services.quran_import import import_index
+from services.quran_index import load_index
+from services.quran_search import build_index as build_search_index
+from bench.fakes import FakeQuranApi, FakeTelegram, FakeUploaderClient, serve
+
+TABLES = ("user_settings", "audio_cache", "broadcasts", "prewarm_jobs", "audio_leases")
+FIRST_USER_ID = 10_000
+
+
+@dataclass
+class Result:
+    name: str
+    requests: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+    db_queries: int = 0
+    api_calls: dict[str, int] = field(default_factory=dict)
+    quran_api: int = 0
+    uploads: int = 0
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Процентиль задержки в мс."""
+        if not self.latencies:
+            return 0.0
+        if len(self.latencies) == 1:
+            return self.latencies[0] * 1000
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[int(p) - 1] * 1000
+
+    def as_dict(self) -> dict:
+        return {
+            "requests":   self.requests,
+            "errors":     self.errors,
+            "elapsed":    round(self.elapsed, 3),
+            "throughput": round(self.throughput, 1),
+            "p50_ms":     round(self.percentile(50), 2),
+            "p99_ms":     round(self.percentile(99), 2),
+            "db_queries": self.db_queries,
+            "api_calls":  self.api_calls,
+            "quran_api":  self.quran_api,
+            "uploads":    self.uploads,
+        }
+
+
+class Bench:
+    def __init__(self, tg_latency: float = 0.0, api_latency: float = 0.0,
+                 audio_size: int = 256 * 1024, upload_bps: float = 20 * 1024 * 1024,
+                 upload_rtt: float = 0.05) -> None:
+        self.telegram = FakeTelegram(latency=tg_latency)
+        self.quran    = FakeQuranApi(audio_size=audio_size, latency=api_latency)
+        self.uploader = FakeUploaderClient(bytes_per_sec=upload_bps, rtt=upload_rtt)
+        self.users: list[int] = []
+        self._update_ids = count(1)
+        self._message_ids = count(1)
+        self._runners = []
+
+    async def start(self) -> None:
+        tg_runner, tg_url = await serve(self.telegram.app())
+        api_runner, api_url = await serve(self.quran.app())
+        self._runners = [tg_runner, api_runner]
+        self.quran.base = api_url
+
+        # Базовые URL импортированы по значению — подменяем в обоих модулях
+        for module in (quran_api, quran_import):
+            module.API_BASE     = f"{api_url}/api"
+            module.ALQURAN_BASE = f"{api_url}/v1"
+
+        await init_db()
+        await self.reset()
+        await import_index()
+        await load_index(await get_db())
+        build_search_index()
+
+        self.bot = Bot(
+            token=BOT_TOKEN,
+            session=AiohttpSession(api=TelegramAPIServer.from_base(tg_url)),
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        )
+        self.dp = create_dispatcher(self.bot)
+
+        uploader._sessions.append(uploader._Session(name="bench", client=self.uploader))
+        jobs.start()
+        blocked.start()
+
+    async def stop(self) -> None:
+        jobs.stop()
+        await blocked.stop()
+        await uploader.stop_clients()
+        await self.bot.session.close()
+        await close_session()
+        await close_db()
+        for runner in self._runners:
+            await runner.cleanup()
+
+    # ─── состояние ─────────────────────────────────────────────────────────
+
+    async def reset(self) -> None:
+        """Пустые таблицы и холодные in-process кэши."""
+        db = await get_db()
+        await db.execute(f"TRUNCATE {', '.join(TABLES)}")
+        self.forget()
+        self.users = []
+
+    def forget(self) -> None:
+        """Сбрасывает только in-process кэши (как после рестарта процесса)."""
+        audio_cache.clear()
+        user_cache.clear()
+        invalidate_reciters()
+
+    async def seed_users(self, n: int, language: str = "ru", reciter_id: int = 1) -> None:
+        db = await get_db()
+        users = range(FIRST_USER_ID, FIRST_USER_ID + n)
+        async with db.acquire() as conn:
+            await conn.copy_records_to_table(
+                "user_settings",
+                records=[(uid, reciter_id, language, 0) for uid in users],
+                columns=("user_id", "reciter_id", "language", "is_blocked"),
+            )
+        self.users = list(users)
+
+    async def settle(self) -> None:
+        """Дожидается фоновой упреждающей загрузки, чтобы она не попала в следующий замер."""
+        pending = list(prefetch._pending.values())
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    # ─── обновления ────────────────────────────────────────────────────────
+
+    def _user(self, uid: int) -> dict:
+        return {"id": uid, "is_bot": False, "first_name": f"user{uid}", "language_code": "ru"}
+
+    def _message(self, uid: int, text: str, from_bot: bool = False) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": uid, "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "bench"} if from_bot else self._user(uid),
+            "text": text,
+        }
+
+    def message(self, uid: int, text: str) -> dict:
+        return {"update_id": next(self._update_ids), "message": self._message(uid, text)}
+
+    def callback(self, uid: int, data: str) -> dict:
+        update_id = next(self._update_ids)
+        return {"update_id": update_id, "callback_query": {
+            "id": str(update_id), "from": self._user(uid), "chat_instance": str(uid),
+            "data": data, "message": self._message(uid, "nav", from_bot=True),
+        }}
+
+    def inline(self, uid: int, query: str) -> dict:
+        update_id = next(self._update_ids)
+        return {"update_id": update_id, "inline_query": {
+            "id": str(update_id), "from": self._user(uid), "query": query, "offset": "",
+        }}
+
+    # ─── прогон ────────────────────────────────────────────────────────────
+
+    async def drive(self, name: str, updates: Iterable[dict], concurrency: int) -> Result:
+        """Подаёт обновления из concurrency параллельных «клиентов».
+        Обновления одного пользователя могут идти параллельно — как и в webhook-режиме."""
+        result   = Result(name)
+        source   = iter(updates)
+        errors   = metrics.UPDATES.sum(status="error")
+        queries  = metrics.DB_QUERY_TIME.count()
+        calls    = self.telegram.calls.copy()
+        requests = self.quran.requests
+        uploads  = self.uploader.uploads
+
+        async def client() -> None:
+            for update in source:
+                started = time.perf_counter()
+                await self.dp.feed_raw_update(self.bot, update)
+                result.latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        result.elapsed = time.perf_counter() - started
+
+        result.requests   = len(result.latencies)
+        result.errors     = int(metrics.UPDATES.sum(status="error") - errors)
+        result.db_queries = metrics.DB_QUERY_TIME.count() - queries
+        result.api_calls  = dict(self.telegram.calls - calls)
+        result.quran_api  = self.quran.requests - requests
+        result.uploads    = self.uploader.uploads - uploads
+        return result
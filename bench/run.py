@@ -0,0 +1,135 @@
+"""
+Бенчмарк бота: python -m bench.run [--scenario ...] [--json out.json] [--baseline base.json]
+
+Поднимает одноразовый PostgreSQL (docker) или берёт --dsn, подменяет Telegram,
+Quran API и MTProto-сессии локальными заменителями и прогоняет сценарии из
+bench/scenarios.py. С --baseline сравнивает p99 с прошлым прогоном и
+завершается с кодом 1, если он вырос больше чем на --max-regression.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+from bench.postgres import check_dsn, disposable_postgres
+
+# config.py читает окружение при импорте: эти значения выставляются до импорта
+# модулей бота и перекрывают .env (load_dotenv не трогает заданные переменные)
+BENCH_ENV = {
+    "BOT_TOKEN":          "123456:BENCH",
+    "API_ID":             "1",
+    "API_HASH":           "bench",
+    "PHONE":              "+10000000000",
+    "EXTRA_PHONES":       "",
+    "STORAGE_CHANNEL_ID": "-1000000000001",
+    "ADMIN_ID":           "1",
+    "MULTI_WORKER":       "0",
+    "SLOW_UPDATE_MS":     "0",
+    "WEBHOOK_URL":        "",
+}
+
+
+def parse_args() -> argparse.Namespace:
+    from_env = os.environ.get
+    p = argparse.ArgumentParser(prog="python -m bench.run", description=__doc__.split("\n\n")[0])
+    p.add_argument("--scenario", action="append", help="сценарий (можно несколько); по умолчанию все")
+    p.add_argument("--users", type=int, default=1000, help="пользователей в БД")
+    p.add_argument("--requests", type=int, default=2000, help="обновлений на сценарий")
+    p.add_argument("--concurrency", type=int, default=50, help="параллельных обновлений")
+    p.add_argument("--prefetch", action="store_true", help="включить упреждающую загрузку")
+    p.add_argument("--broadcast-rate", type=float, default=1000, help="BROADCAST_RATE для сценария broadcast")
+    p.add_argument("--tg-latency", type=float, default=0.0, help="задержка ответа Bot API, сек")
+    p.add_argument("--api-latency", type=float, default=0.0, help="задержка Quran API, сек")
+    p.add_argument("--audio-size", type=int, default=256 * 1024, help="размер mp3, байт")
+    p.add_argument("--upload-rtt", type=float, default=0.05, help="задержка загрузки в storage-канал, сек")
+    p.add_argument("--dsn", default=from_env("BENCH_DATABASE_URL"), help="существующая база вместо docker")
+    p.add_argument("--force", action="store_true", help="разрешить --dsn без «bench» в имени базы")
+    p.add_argument("--json", help="сохранить результаты в файл")
+    p.add_argument("--baseline", help="результаты прошлого прогона (--json) для сравнения")
+    p.add_argument("--max-regression", type=float, default=0.2, help="допустимый рост p99 (0.2 = 20%%)")
+    return p.parse_args()
+
+
+def _print_table(results: dict[str, dict]) -> None:
+    header = f"{'scenario':<12}{'req':>7}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p99 ms':>9}{'db q':>8}{'api':>7}{'upl':>6}"
+    print(header)
+    print("─" * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:<12}{r['requests']:>7}{r['errors']:>5}{r['throughput']:>9.1f}"
+            f"{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['db_queries']:>8}"
+            f"{sum(r['api_calls'].values()):>7}{r['uploads']:>6}"
+        )
+
+
+def _regressions(results: dict[str, dict], baseline: dict[str, dict], limit: float) -> list[str]:
+    found = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base or not base["p99_ms"] or not r["p99_ms"]:
+            continue
+        growth = r["p99_ms"] / base["p99_ms"] - 1
+        if growth > limit:
+            found.append(f"{name}: p99 {base['p99_ms']:.1f} → {r['p99_ms']:.1f} ms (+{growth:.0%})")
+    return found
+
+
+async def run(args: argparse.Namespace) -> dict[str, dict]:
+    async with disposable_postgres(args.dsn) as dsn:
+        os.environ["DATABASE_URL"] = dsn
+
+        # Модули бота — только после того, как окружение готово
+        from bench.harness import Bench
+        from bench.scenarios import SCENARIOS
+
+        names = args.scenario or list(SCENARIOS)
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise SystemExit(f"bench: unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        bench = Bench(
+            tg_latency=args.tg_latency, api_latency=args.api_latency,
+            audio_size=args.audio_size, upload_rtt=args.upload_rtt,
+        )
+        await bench.start()
+        results = {}
+        try:
+            for name in names:
+                result = await SCENARIOS[name](bench, args.users, args.requests, args.concurrency)
+                results[name] = result.as_dict()
+        finally:
+            await bench.stop()
+        return results
+
+
+def main() -> None:
+    args = parse_args()
+    if args.dsn:
+        check_dsn(args.dsn, args.force)
+
+    os.environ.update(BENCH_ENV)
+    os.environ["BROADCAST_RATE"] = str(args.broadcast_rate)
+    if not args.prefetch:
+        os.environ["PREFETCH_AYAHS"] = os.environ["PREFETCH_SURAHS"] = "0"
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s | %(name)s | %(message)s")
+    results = asyncio.run(run(args))
+    _print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = _regressions(results, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Сценарии нагрузки. Каждый готовит состояние БД и возвращает Result;
+users и requests задаются из командной строки (bench/run.py).
+"""
+import time
+from itertools import cycle, islice
+
+from config import ADMIN_ID
+from database.db import get_db
+from database.models import create_broadcast, get_unfinished_broadcast, save_to_cache
+from services.broadcast import Broadcast
+from services.quran_meta import ayah_count
+from bench.harness import Bench, Result
+
+RECITER = "1"   # identifier чтеца с id=1 (см. seed в миграциях)
+
+
+async def hit_storm(bench: Bench, users: int, requests: int, concurrency: int) -> Result:
+    """Все просят одну и ту же закэшированную суру — чистая стоимость горячего пути."""
+    await bench.reset()
+    await bench.seed_users(users)
+    await save_to_cache(await get_db(), RECITER, 36, None, "bench-36", "36", "36", "Ya-Sin", "Reciter 1")
+    bench.forget()
+    updates = (bench.message(uid, "36") for uid in islice(cycle(bench.users), requests))
+    return await bench.drive("hit_storm", updates, concurrency)
+
+
+async def cold_miss(bench: Bench, users: int, requests: int, concurrency: int) -> Result:
+    """Разные ещё не загруженные аяты: скачивание + загрузка в storage-канал."""
+    await bench.reset()
+    await bench.seed_users(users)
+    ayahs   = range(1, min(requests, ayah_count(2)) + 1)
+    updates = (bench.message(uid, f"2:{a}") for uid, a in zip(cycle(bench.users), ayahs))
+    result  = await bench.drive("cold_miss", updates, concurrency)
+    await bench.settle()
+    return result
+
+
+async def navigation(bench: Bench, users: int, requests: int, concurrency: int) -> Result:
+    """Пользователи листают суру 67 кнопкой ▶️ — первый проход холодный, остальные
+    попадают в кэш (или в упреждающую загрузку при PREFETCH_AYAHS)."""
+    await bench.reset()
+    await bench.seed_users(users)
+    steps = ayah_count(67)
+
+    def updates():
+        sent = 0
+        for step in cycle(range(1, steps + 1)):
+            for uid in bench.users:
+                if sent == requests:
+                    return
+                yield bench.callback(uid, f"nav:a:67:{step}")
+                sent += 1
+
+    result = await bench.drive("navigation", updates(), concurrency)
+    await bench.settle()
+    return result
+
+
+async def passage(bench: Bench, users: int, requests: int, concurrency: int) -> Result:
+    """Отрывки «67:1-10» / «67:11-20» / «67:21-30»: один запрос к БД и альбомы
+    sendMediaGroup вместо десятка отдельных аудио. Первый проход загружает недостающее."""
+    await bench.reset()
+    await bench.seed_users(users)
+    ranges  = cycle(("67:1-10", "67:11-20", "67:21-30"))
+    updates = (
+        bench.message(uid, text)
+        for uid, text in islice(zip(cycle(bench.users), ranges), requests)
+    )
+    result = await bench.drive("passage", updates, concurrency)
+    await bench.settle()
+    return result
+
+
+async def inline(bench: Bench, users: int, requests: int, concurrency: int) -> Result:
+    """Inline-режим: поиск по названию и номеру, «поделиться» и список чтецов."""
+    await bench.reset()
+    await bench.seed_users(users)
+    db = await get_db()
+    for a in range(1, 11):
+        await save_to_cache(db, RECITER, 36, a, f"bench-36-{a}", f"36:{a}", f"36:{a}", "Ya-Sin", "Reciter 1")
+    await save_to_cache(db, RECITER, 2, 255, "bench-2-255", "2:255", "2:255", "Al-Baqarah", "Reciter 1")
+    bench.forget()
+
+    queries = cycle(("yasin", "2:255", "36", "share:1:ru:a:2:255", "share:1:ru:s:36", ""))
+    updates = (
+        bench.inline(uid, q)
+        for uid, q in islice(zip(cycle(bench.users), queries), requests)
+    )
+    return await bench.drive("inline", updates, concurrency)
+
+
+async def broadcast(bench: Bench, users: int, requests: int, concurrency: int) -> Result:
+    """Рассылка всем users; важна только пропускная способность (BROADCAST_RATE)."""
+    await bench.reset()
+    await bench.seed_users(users)
+    db = await get_db()
+    await create_broadcast(db, "bench", None, None, ADMIN_ID, 1, users)
+    state = await get_unfinished_broadcast(db)
+
+    job     = Broadcast(bench.bot, state)
+    calls   = bench.telegram.calls.copy()
+    started = time.perf_counter()
+    await job.run()
+    return Result(
+        "broadcast",
+        requests=job.processed,
+        errors=job.failed,
+        elapsed=time.perf_counter() - started,
+        api_calls=dict(bench.telegram.calls - calls),
+    )
+
+
+SCENARIOS = {
+    "hit_storm":  hit_storm,
+    "cold_miss":  cold_miss,
+    "navigation": navigation,
+    "passage":    passage,
+    "inline":     inline,
+    "broadcast":  broadcast,
+}
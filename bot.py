@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import signal
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
@@ -10,11 +11,15 @@ from aiogram.types import ErrorEvent
 
 from aiohttp import web
 
-from config import BOT_TOKEN
+from config import BOT_TOKEN, API_HOST, API_PORT, MULTI_WORKER
 from database.db import init_db, close_db, get_db
-from database.models import mark_user_blocked
 from handlers import start, reciter, quran, admin
-from services.uploader import get_client, stop_client
+from middlewares import metrics as metrics_middleware, tracing as tracing_middleware
+from services.http import get_session, close_session
+from services.quran_index import load_index
+from services.quran_search import build_index as build_search_index
+from services import blocked, broadcast, cluster, jobs, prewarm, stats, webhook
+from services.uploader import start_clients, stop_clients
 from services.miniapp_api import make_app
 
 logging.basicConfig(
@@ -24,20 +29,19 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main() -> None:
-    session = AiohttpSession(timeout=300)  # 5 минут — для больших аудиофайлов
-    bot = Bot(
-        token=BOT_TOKEN,
-        session=session,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
-    )
-    dp = Dispatcher()
+async def _wait_for_signal() -> None:
+    """В webhook-режиме работаем до SIGINT/SIGTERM, затем штатно выходим в finally."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    logger.info("Shutting down")
 
-    # Init DB tables & seed reciters
-    await init_db()
 
-    # Запускаем Pyrogram user-клиент (может запросить код из SMS при первом запуске)
-    await get_client()
+def create_dispatcher(bot: Bot) -> Dispatcher:
+    """Диспетчер со всеми роутерами и middleware (используется и в bench/)."""
+    dp = Dispatcher()
 
     # Register routers (order matters — more specific first)
     dp.include_router(admin.router)
@@ -45,6 +49,11 @@ async def main() -> None:
     dp.include_router(reciter.router)
     dp.include_router(quran.router)
 
+    # Счётчики и задержки обработчиков для /metrics; трассировка медленных
+    # обновлений (SLOW_UPDATE_MS) и /profile
+    metrics_middleware.setup(dp)
+    tracing_middleware.setup(dp, bot)
+
     @dp.error()
     async def on_error(event: ErrorEvent) -> bool:
         if isinstance(event.exception, TelegramForbiddenError):
@@ -55,25 +64,88 @@ async def main() -> None:
             elif upd.callback_query:
                 user_id = upd.callback_query.from_user.id
             if user_id:
-                db = await get_db()
-                await mark_user_blocked(db, user_id)
+                await blocked.add(user_id)
         return True
 
-    # Start mini app HTTP API
+    return dp
+
+
+async def main() -> None:
+    session = AiohttpSession(timeout=300)  # 5 минут — для больших аудиофайлов
+    bot = Bot(
+        token=BOT_TOKEN,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    dp = create_dispatcher(bot)
+
+    # getUpdates может читать только один процесс
+    if MULTI_WORKER and not webhook.is_enabled():
+        raise RuntimeError("MULTI_WORKER=1 requires webhook mode (WEBHOOK_URL)")
+
+    # Init DB tables & seed reciters
+    await init_db()
+
+    # Локальный индекс сур и переводов (см. services/quran_import.py)
+    await load_index(await get_db())
+    build_search_index()
+
+    # Общая HTTP-сессия для Quran API и скачивания аудио
+    await get_session()
+
+    # Запускаем пул Pyrogram user-сессий (может запросить код из SMS при первом запуске)
+    await start_clients()
+
+    # Start mini app HTTP API (в webhook-режиме он же принимает обновления)
     api_app = make_app()
+    if webhook.is_enabled():
+        webhook.setup_webhook(api_app, dp, bot)
     api_runner = web.AppRunner(api_app)
     await api_runner.setup()
-    api_site = web.TCPSite(api_runner, "127.0.0.1", 8085)
+    api_site = web.TCPSite(api_runner, API_HOST, API_PORT)
     await api_site.start()
-    logger.info("Mini app API started on http://127.0.0.1:8085")
+    logger.info("Mini app API started on http://%s:%s", API_HOST, API_PORT)
+
+    # Пакетная запись заблокировавших бота и воркеры очереди загрузок
+    blocked.start()
+    jobs.start()
+
+    # Фоновые задачи выполняет только лидер (единственный процесс без MULTI_WORKER):
+    # снимок статистики, прогрев кэша и рассылка, прерванные перезапуском
+    async def on_elected() -> None:
+        stats.start()
+        await prewarm.resume(bot)
+        await broadcast.resume(bot)
+
+    async def on_demoted() -> None:
+        stats.stop()
+        await prewarm.cancel()
+        await broadcast.cancel()
+
+    cluster.on_command("broadcast",      lambda: broadcast.restart(bot))
+    cluster.on_command("broadcast_stop", broadcast.cancel)
+    cluster.on_command("prewarm",        lambda: prewarm.restart(bot))
+    cluster.on_command("prewarm_stop",   prewarm.halt)
+    await cluster.start(on_elected, on_demoted)
 
     logger.info("Bot started")
     try:
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if webhook.is_enabled():
+            await webhook.set_webhook(bot, dp)
+            await _wait_for_signal()
+        else:
+            await bot.delete_webhook()  # иначе getUpdates вернёт конфликт
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
+        # Сначала HTTP-сервер: в webhook-режиме cleanup дожидается уже принятых
+        # обновлений, которым ещё нужны очередь загрузок, blocked и БД
         await api_runner.cleanup()
+        await cluster.stop()
+        jobs.stop()
+        await blocked.stop()
         await close_db()
-        await stop_client()
+        await close_session()
+        await stop_clients()
         await bot.session.close()
 
 
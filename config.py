@@ -9,7 +9,77 @@ DATABASE_URL: str = os.environ["DATABASE_URL"]
 API_ID: int = int(os.environ["API_ID"])
 API_HASH: str = os.environ["API_HASH"]
 PHONE: str = os.environ["PHONE"]
+# Дополнительные аккаунты для параллельной загрузки в storage-канал (через запятую)
+UPLOADER_PHONES: list[str] = [PHONE] + [
+    p.strip() for p in os.environ.get("EXTRA_PHONES", "").split(",") if p.strip()
+]
 STORAGE_CHANNEL_ID: int = int(os.environ["STORAGE_CHANNEL_ID"])
 ADMIN_ID: int = int(os.environ["ADMIN_ID"])
 
 QURAN_API_BASE = "https://quranapi.pages.dev/api"
+
+# In-process кэш записей audio_cache: размер (записей) и TTL (сек, 0 — без TTL)
+AUDIO_CACHE_SIZE: int = int(os.environ.get("AUDIO_CACHE_SIZE", "20000"))
+AUDIO_CACHE_TTL: float = float(os.environ.get("AUDIO_CACHE_TTL", "0"))
+
+# In-process кэш настроек пользователя (язык + чтец)
+USER_CACHE_SIZE: int = int(os.environ.get("USER_CACHE_SIZE", "50000"))
+USER_CACHE_TTL: float = float(os.environ.get("USER_CACHE_TTL", "600"))
+
+# Готовые ответы (куски подписи + клавиатура навигации) по сурам и аятам
+RENDER_CACHE_SIZE: int = int(os.environ.get("RENDER_CACHE_SIZE", "20000"))
+
+# Пул HTTP-соединений к Quran API и источникам аудио
+HTTP_POOL_LIMIT: int = int(os.environ.get("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_PER_HOST: int = int(os.environ.get("HTTP_POOL_PER_HOST", "20"))
+
+# Фоновый прогрев кэша: сколько файлов качать/загружать одновременно
+PREWARM_CONCURRENCY: int = int(os.environ.get("PREWARM_CONCURRENCY", "3"))
+
+# Упреждающая загрузка: сколько следующих аятов/сур готовить в фоне,
+# сколько загрузок одновременно и предел очереди (0 — выключено)
+PREFETCH_AYAHS: int = int(os.environ.get("PREFETCH_AYAHS", "2"))
+PREFETCH_SURAHS: int = int(os.environ.get("PREFETCH_SURAHS", "1"))
+PREFETCH_CONCURRENCY: int = int(os.environ.get("PREFETCH_CONCURRENCY", "2"))
+PREFETCH_MAX_PENDING: int = int(os.environ.get("PREFETCH_MAX_PENDING", "20"))
+
+# Рассылка: предел скорости (сообщ./сек) и число параллельных воркеров
+BROADCAST_RATE: float = float(os.environ.get("BROADCAST_RATE", "28"))
+BROADCAST_WORKERS: int = int(os.environ.get("BROADCAST_WORKERS", "8"))
+
+# Пакетная запись заблокировавших бота: размер пачки и период сброса (сек)
+BLOCKED_FLUSH_SIZE: int = int(os.environ.get("BLOCKED_FLUSH_SIZE", "500"))
+BLOCKED_FLUSH_INTERVAL: float = float(os.environ.get("BLOCKED_FLUSH_INTERVAL", "5"))
+
+# Загружать аудио в storage-канал параллельно со скачиванием (без temp-файла)
+STREAM_UPLOADS: bool = os.environ.get("STREAM_UPLOADS", "1") == "1"
+
+# Очередь загрузок по промахам кэша: параллельные скачивания, параллельные
+# загрузки в storage-канал и максимум задач в очереди
+DOWNLOAD_WORKERS: int = int(os.environ.get("DOWNLOAD_WORKERS", "4"))
+UPLOAD_WORKERS: int = int(os.environ.get("UPLOAD_WORKERS", "4"))
+JOB_MAX_DEPTH: int = int(os.environ.get("JOB_MAX_DEPTH", "100"))
+
+# Как часто пересчитывать снимок статистики для /stats (сек)
+STATS_REFRESH_INTERVAL: float = float(os.environ.get("STATS_REFRESH_INTERVAL", "300"))
+
+# HTTP-сервер мини-аппа (и webhook'а)
+API_HOST: str = os.environ.get("API_HOST", "127.0.0.1")
+API_PORT: int = int(os.environ.get("API_PORT", "8085"))
+
+# Webhook вместо long polling — включается, если задан публичный WEBHOOK_URL
+WEBHOOK_URL: str = os.environ.get("WEBHOOK_URL", "")
+WEBHOOK_PATH: str = os.environ.get("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET: str = os.environ.get("WEBHOOK_SECRET", "")
+
+# Несколько процессов бота на одной БД: аренда загрузок в audio_leases,
+# LISTEN/NOTIFY между воркерами и один лидер для фоновых задач
+MULTI_WORKER: bool = os.environ.get("MULTI_WORKER", "0") == "1"
+WORKER_ID: str = os.environ.get("WORKER_ID", "")     # суффикс имён Pyrogram-сессий воркера
+LEASE_TTL: int = int(os.environ.get("LEASE_TTL", "120"))  # сек, продлевается во время загрузки
+
+# Если задан — /metrics требует заголовок Authorization: Bearer <METRICS_TOKEN>
+METRICS_TOKEN: str = os.environ.get("METRICS_TOKEN", "")
+
+# Обновления дольше этого порога (мс) логируются с разбивкой по шагам; 0 — выключено
+SLOW_UPDATE_MS: int = int(os.environ.get("SLOW_UPDATE_MS", "0"))
@@ -0,0 +1,52 @@
+"""
+Простой in-process LRU-кэш с необязательным TTL.
+Используется перед запросами к БД на горячем пути.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    def __init__(self, maxsize: int, ttl: float = 0) -> None:
+        self.maxsize = maxsize
+        self.ttl     = ttl  # 0 — без ограничения по времени
+        self.hits    = 0
+        self.misses  = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        stored_at, value = item
+        if self.ttl and time.monotonic() - stored_at > self.ttl:
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size":   len(self._data),
+            "hits":   self.hits,
+            "misses": self.misses,
+        }
@@ -1,16 +1,65 @@
+import asyncio
+import logging
+import re
+from pathlib import Path
+
 import asyncpg
+
+import tracing
 from config import DATABASE_URL
+from metrics import DB_QUERY_TIME, DB_ERRORS, Gauge
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATION_LOCK = 7_751_110_001   # id advisory lock'а на время миграций
+MIGRATION_LOCK_POLL = 0.5       # сек между попытками взять lock
+NO_TRANSACTION = "-- migrate: no-transaction"
+RE_CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.I,
+)
 
 _pool: asyncpg.Pool | None = None
 
 
+def _log_query(record) -> None:
+    DB_QUERY_TIME.observe(record.elapsed)
+    if tracing.current() is not None:  # подпись span'а строим только под трассой
+        tracing.record("db", " ".join(record.query.split())[:60], record.elapsed)
+    if record.exception is not None:
+        DB_ERRORS.inc()
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    # Пул после каждого release выполняет reset-запрос соединения
+    # (pg_advisory_unlock_all, UNLISTEN, RESET ALL; в транзакции — с ROLLBACK
+    # впереди). Это не запрос приложения — в метрики и трассу не пишем.
+    get_reset_query = getattr(conn, "get_reset_query", None) or conn._get_reset_query
+    reset_query = get_reset_query()
+
+    def log_query(record) -> None:
+        if not (reset_query and record.query.endswith(reset_query)):
+            _log_query(record)
+
+    conn.add_query_logger(log_query)
+
+
 async def get_db() -> asyncpg.Pool:
     global _pool
     if _pool is None:
-        _pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=10)
+        _pool = await asyncpg.create_pool(
+            DATABASE_URL, min_size=1, max_size=10, init=_init_connection,
+        )
     return _pool
 
 
+Gauge("db_pool_connections", "asyncpg pool connections by state", lambda: {
+    (("state", "open"),): _pool.get_size(),
+    (("state", "idle"),): _pool.get_idle_size(),
+    (("state", "max"),):  _pool.get_max_size(),
+} if _pool else {})
+
+
 async def close_db() -> None:
     global _pool
     if _pool:
@@ -18,45 +67,72 @@ async def close_db() -> None:
         _pool = None
 
 
-async def init_db() -> None:
-    pool = await get_db()
-    async with pool.acquire() as conn:
+async def _drop_invalid_index(conn: asyncpg.Connection, name: str) -> None:
+    """Прерванный CREATE INDEX CONCURRENTLY оставляет INVALID-индекс, который
+    IF NOT EXISTS молча пропустил бы — удаляем его, чтобы построить заново."""
+    valid = await conn.fetchval(
+        "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass($1)", name,
+    )
+    if valid is False:
+        logger.warning("Dropping invalid index %s left by an interrupted migration", name)
+        await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+async def _lock(conn: asyncpg.Connection) -> None:
+    # Не pg_advisory_lock: ожидающий держал бы открытый снимок, а CREATE INDEX
+    # CONCURRENTLY у владельца lock'а ждёт завершения всех старых снимков — deadlock.
+    while not await conn.fetchval("SELECT pg_try_advisory_lock($1)", MIGRATION_LOCK):
+        await asyncio.sleep(MIGRATION_LOCK_POLL)
+
+
+async def _apply(conn: asyncpg.Connection, version: int, name: str, sql: str) -> None:
+    if NO_TRANSACTION in sql:
+        # CREATE INDEX CONCURRENTLY нельзя выполнять в транзакции — выполняем
+        # по одному оператору; такие миграции должны быть идемпотентны.
+        code = "\n".join(l for l in sql.splitlines() if not l.strip().startswith("--"))
+        for stmt in code.split(";"):
+            if not stmt.strip():
+                continue
+            if m := RE_CONCURRENT_INDEX.search(stmt):
+                await _drop_invalid_index(conn, m.group(1))
+            await conn.execute(stmt)
+        await conn.execute(
+            "INSERT INTO schema_version (version, name) VALUES ($1, $2)", version, name
+        )
+        return
+
+    async with conn.transaction():
+        await conn.execute(sql)
+        await conn.execute(
+            "INSERT INTO schema_version (version, name) VALUES ($1, $2)", version, name
+        )
+
+
+async def migrate(conn: asyncpg.Connection) -> None:
+    """Применяет новые файлы migrations/NNNN_name.sql по порядку.
+    Advisory lock не даёт двум процессам мигрировать одновременно."""
+    await _lock(conn)
+    try:
         await conn.execute("""
-            CREATE TABLE IF NOT EXISTS reciters (
-                id          SERIAL PRIMARY KEY,
-                identifier  TEXT UNIQUE NOT NULL,
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version     INTEGER PRIMARY KEY,
                 name        TEXT NOT NULL,
-                name_ru     TEXT,
-                is_active   INTEGER DEFAULT 1
-            );
-
-            CREATE TABLE IF NOT EXISTS user_settings (
-                user_id     BIGINT PRIMARY KEY,
-                reciter_id  INTEGER REFERENCES reciters(id),
-                language    TEXT DEFAULT 'ru',
-                is_blocked  INTEGER DEFAULT 0,
-                updated_at  TIMESTAMPTZ DEFAULT NOW()
-            );
-
-            CREATE TABLE IF NOT EXISTS audio_cache (
-                id              SERIAL PRIMARY KEY,
-                reciter_id      TEXT NOT NULL,
-                surah_number    INTEGER NOT NULL,
-                ayah_number     INTEGER,
-                file_id         TEXT NOT NULL,
-                caption_ru      TEXT,
-                caption_uz      TEXT,
-                title           TEXT,
-                performer       TEXT,
-                created_at      TIMESTAMPTZ DEFAULT NOW(),
-                UNIQUE NULLS NOT DISTINCT (reciter_id, surah_number, ayah_number)
-            );
-
-            INSERT INTO reciters (identifier, name, name_ru) VALUES
-                ('1', 'Mishary Rashid Al Afasy',   'Мишари Рашид Аль-Афаси'),
-                ('2', 'Abu Bakr Al Shatri',        'Абу Бакр Аш-Шатри'),
-                ('3', 'Nasser Al Qatami',          'Насер Аль-Катами'),
-                ('4', 'Yasser Al Dosari',          'Ясир Аль-Досари'),
-                ('5', 'Hani Ar Rifai',             'Хани Ар-Рифаи')
-            ON CONFLICT (identifier) DO NOTHING;
+                applied_at  TIMESTAMPTZ DEFAULT NOW()
+            )
         """)
+        applied = {r["version"] for r in await conn.fetch("SELECT version FROM schema_version")}
+
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            version = int(path.name.split("_", 1)[0])
+            if version in applied:
+                continue
+            logger.info("Applying migration %s", path.name)
+            await _apply(conn, version, path.stem, path.read_text(encoding="utf-8"))
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK)
+
+
+async def init_db() -> None:
+    pool = await get_db()
+    async with pool.acquire() as conn:
+        await migrate(conn)
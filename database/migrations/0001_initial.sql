@@ -0,0 +1,67 @@
+-- Базовая схема. IF NOT EXISTS — чтобы миграция прошла и на базах,
+-- созданных до появления schema_version.
+
+CREATE TABLE IF NOT EXISTS reciters (
+    id          SERIAL PRIMARY KEY,
+    identifier  TEXT UNIQUE NOT NULL,
+    name        TEXT NOT NULL,
+    name_ru     TEXT,
+    is_active   INTEGER DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS user_settings (
+    user_id     BIGINT PRIMARY KEY,
+    reciter_id  INTEGER REFERENCES reciters(id),
+    language    TEXT DEFAULT 'ru',
+    is_blocked  INTEGER DEFAULT 0,
+    updated_at  TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS audio_cache (
+    id              SERIAL PRIMARY KEY,
+    reciter_id      TEXT NOT NULL,
+    surah_number    INTEGER NOT NULL,
+    ayah_number     INTEGER,
+    file_id         TEXT NOT NULL,
+    caption_ru      TEXT,
+    caption_uz      TEXT,
+    title           TEXT,
+    performer       TEXT,
+    created_at      TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE NULLS NOT DISTINCT (reciter_id, surah_number, ayah_number)
+);
+
+CREATE TABLE IF NOT EXISTS surahs (
+    number            INTEGER PRIMARY KEY,
+    name              TEXT NOT NULL,
+    name_arabic       TEXT NOT NULL,
+    name_translation  TEXT NOT NULL,
+    total_ayah        INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ayah_texts (
+    surah_number    INTEGER NOT NULL,
+    ayah_number     INTEGER NOT NULL,
+    text_ar         TEXT,
+    text_ru         TEXT,
+    text_uz         TEXT,
+    PRIMARY KEY (surah_number, ayah_number)
+);
+
+CREATE TABLE IF NOT EXISTS prewarm_jobs (
+    reciter_id      TEXT NOT NULL,
+    mode            TEXT NOT NULL,
+    surah_number    INTEGER NOT NULL DEFAULT 0,
+    ayah_number     INTEGER NOT NULL DEFAULT 0,
+    done            BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at      TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (reciter_id, mode)
+);
+
+INSERT INTO reciters (identifier, name, name_ru) VALUES
+    ('1', 'Mishary Rashid Al Afasy',   'Мишари Рашид Аль-Афаси'),
+    ('2', 'Abu Bakr Al Shatri',        'Абу Бакр Аш-Шатри'),
+    ('3', 'Nasser Al Qatami',          'Насер Аль-Катами'),
+    ('4', 'Yasser Al Dosari',          'Ясир Аль-Досари'),
+    ('5', 'Hani Ar Rifai',             'Хани Ар-Рифаи')
+ON CONFLICT (identifier) DO NOTHING;
@@ -0,0 +1,18 @@
+-- migrate: no-transaction
+-- Индексы под горячие запросы. CONCURRENTLY — без блокировки записи в таблицу.
+
+-- Рассылка: SELECT user_id ... WHERE is_blocked = 0 (index-only scan)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS user_settings_active_idx
+    ON user_settings (user_id) WHERE is_blocked = 0;
+
+-- Статистика: группировка по языку с подсчётом заблокировавших
+CREATE INDEX CONCURRENTLY IF NOT EXISTS user_settings_language_idx
+    ON user_settings (language) INCLUDE (is_blocked);
+
+-- Статистика: группировка по чтецу
+CREATE INDEX CONCURRENTLY IF NOT EXISTS user_settings_reciter_idx
+    ON user_settings (reciter_id) INCLUDE (is_blocked) WHERE reciter_id IS NOT NULL;
+
+-- Возобновление прогрева: только незавершённые задачи
+CREATE INDEX CONCURRENTLY IF NOT EXISTS prewarm_jobs_pending_idx
+    ON prewarm_jobs (reciter_id, mode) WHERE NOT done;
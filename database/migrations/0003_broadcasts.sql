@@ -0,0 +1,19 @@
+-- Состояние рассылок: курсор по user_id, чтобы продолжить после перезапуска.
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id                  SERIAL PRIMARY KEY,
+    text                TEXT,
+    src_chat_id         BIGINT,
+    src_message_id      BIGINT,
+    status_chat_id      BIGINT NOT NULL,
+    status_message_id   BIGINT NOT NULL,
+    last_user_id        BIGINT NOT NULL DEFAULT 0,
+    total               INTEGER NOT NULL DEFAULT 0,
+    sent                INTEGER NOT NULL DEFAULT 0,
+    blocked             INTEGER NOT NULL DEFAULT 0,
+    failed              INTEGER NOT NULL DEFAULT 0,
+    done                BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at          TIMESTAMPTZ DEFAULT NOW(),
+    updated_at          TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS broadcasts_pending_idx ON broadcasts (id) WHERE NOT done;
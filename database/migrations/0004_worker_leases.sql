@@ -0,0 +1,7 @@
+-- Аренда загрузки аудио между воркерами: строка на ключ "reciter:surah:ayah",
+-- истёкшую аренду (упавший воркер) может перехватить другой процесс.
+CREATE TABLE IF NOT EXISTS audio_leases (
+    key         TEXT PRIMARY KEY,
+    owner       TEXT NOT NULL,
+    expires_at  TIMESTAMPTZ NOT NULL
+);
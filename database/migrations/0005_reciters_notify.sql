@@ -0,0 +1,12 @@
+-- Любое изменение reciters сбрасывает список чтецов в памяти всех процессов бота.
+CREATE OR REPLACE FUNCTION notify_reciters_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('reciters_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS reciters_changed ON reciters;
+CREATE TRIGGER reciters_changed
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON reciters
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_reciters_changed();
@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+-- get_stats считает все GROUPING SETS за один Seq Scan по user_settings
+-- (MixedAggregate) — индексы по языку и чтецу планировщик не использует,
+-- а каждую запись в user_settings они замедляют.
+
+DROP INDEX CONCURRENTLY IF EXISTS user_settings_language_idx;
+
+DROP INDEX CONCURRENTLY IF EXISTS user_settings_reciter_idx;
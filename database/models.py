@@ -1,6 +1,28 @@
 from dataclasses import dataclass
+from typing import AsyncIterator
 import asyncpg
 
+from config import AUDIO_CACHE_SIZE, AUDIO_CACHE_TTL, USER_CACHE_SIZE, USER_CACHE_TTL
+from database.cache import LRUCache
+from metrics import CACHE_LOOKUPS, Gauge
+
+# (reciter_id, surah, ayah) -> строка audio_cache. Строки не меняются после
+# записи, поэтому кэшируем только попадания; save_to_cache пишет насквозь.
+audio_cache = LRUCache(AUDIO_CACHE_SIZE, AUDIO_CACHE_TTL)
+
+# user_id -> UserContext. Сбрасывается в set_user_language / set_user_reciter,
+# на остальных воркерах — по NOTIFY USER_CHANGED (services/cluster.py).
+user_cache = LRUCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+USER_CHANGED = "user_changed"
+
+for _name, _cache in (("audio", audio_cache), ("user", user_cache)):
+    Gauge(f"{_name}_lru_entries", f"Entries in the in-memory {_name} cache",
+          lambda c=_cache: c.stats()["size"])
+    Gauge(f"{_name}_lru_hits_total", f"Hits of the in-memory {_name} cache",
+          lambda c=_cache: c.stats()["hits"], kind="counter")
+    Gauge(f"{_name}_lru_misses_total", f"Misses of the in-memory {_name} cache",
+          lambda c=_cache: c.stats()["misses"], kind="counter")
+
 
 @dataclass
 class Reciter:
@@ -15,115 +37,238 @@ class Reciter:
         return self.name_ru or self.name
 
 
+@dataclass
+class UserContext:
+    language: str | None
+    reciter: Reciter | None
+
+
 # ---------- Reciters ----------
 
+# Активные чтецы держим в памяти: таблица меняется только вручную, триггер
+# на reciters шлёт NOTIFY RECITERS_CHANGED, и cluster сбрасывает список.
+RECITERS_CHANGED = "reciters_changed"
+_reciters: list[Reciter] | None = None
+
+
+def invalidate_reciters() -> None:
+    global _reciters
+    _reciters = None
+
+
 async def get_all_reciters(db: asyncpg.Pool) -> list[Reciter]:
-    rows = await db.fetch(
-        "SELECT id, identifier, name, name_ru, is_active FROM reciters WHERE is_active=1 ORDER BY id"
-    )
-    return [Reciter(**dict(r)) for r in rows]
+    global _reciters
+    if _reciters is None:
+        rows = await db.fetch(
+            "SELECT id, identifier, name, name_ru, is_active FROM reciters WHERE is_active=1 ORDER BY id"
+        )
+        _reciters = [Reciter(**dict(r)) for r in rows]
+    return list(_reciters)
 
 
 async def get_reciter_by_id(db: asyncpg.Pool, reciter_id: int) -> Reciter | None:
-    row = await db.fetchrow(
-        "SELECT id, identifier, name, name_ru, is_active FROM reciters WHERE id=$1",
-        reciter_id,
-    )
-    return Reciter(**dict(row)) if row else None
+    """Активный чтец по id (из списка в памяти)."""
+    return next((r for r in await get_all_reciters(db) if r.id == reciter_id), None)
 
 
 async def get_user_reciter(db: asyncpg.Pool, user_id: int) -> Reciter | None:
-    row = await db.fetchrow(
-        """
-        SELECT r.id, r.identifier, r.name, r.name_ru, r.is_active
-        FROM user_settings us JOIN reciters r ON r.id = us.reciter_id
-        WHERE us.user_id = $1
-        """,
-        user_id,
-    )
-    return Reciter(**dict(row)) if row else None
+    return (await get_user_context(db, user_id)).reciter
 
 
 async def set_user_reciter(db: asyncpg.Pool, user_id: int, reciter_id: int) -> None:
     await db.execute(
         """
-        INSERT INTO user_settings (user_id, reciter_id, updated_at)
-        VALUES ($1, $2, NOW())
-        ON CONFLICT (user_id) DO UPDATE SET reciter_id = EXCLUDED.reciter_id, updated_at = NOW()
+        WITH upsert AS (
+            INSERT INTO user_settings (user_id, reciter_id, updated_at)
+            VALUES ($1, $2, NOW())
+            ON CONFLICT (user_id) DO UPDATE SET reciter_id = EXCLUDED.reciter_id, updated_at = NOW()
+            RETURNING user_id
+        )
+        SELECT pg_notify($3, user_id::text) FROM upsert
         """,
-        user_id, reciter_id,
+        user_id, reciter_id, USER_CHANGED,
     )
+    user_cache.pop(user_id)
 
 
 # ---------- Language ----------
 
 async def get_user_language(db: asyncpg.Pool, user_id: int) -> str | None:
-    return await db.fetchval(
-        "SELECT language FROM user_settings WHERE user_id=$1", user_id
-    )
+    return (await get_user_context(db, user_id)).language
 
 
 async def set_user_language(db: asyncpg.Pool, user_id: int, language: str) -> None:
     await db.execute(
         """
-        INSERT INTO user_settings (user_id, language, updated_at)
-        VALUES ($1, $2, NOW())
-        ON CONFLICT (user_id) DO UPDATE SET language = EXCLUDED.language, updated_at = NOW()
+        WITH upsert AS (
+            INSERT INTO user_settings (user_id, language, updated_at)
+            VALUES ($1, $2, NOW())
+            ON CONFLICT (user_id) DO UPDATE SET language = EXCLUDED.language, updated_at = NOW()
+            RETURNING user_id
+        )
+        SELECT pg_notify($3, user_id::text) FROM upsert
         """,
-        user_id, language,
+        user_id, language, USER_CHANGED,
     )
+    user_cache.pop(user_id)
+
+
+# ---------- User context ----------
+
+async def get_user_context(db: asyncpg.Pool, user_id: int) -> UserContext:
+    """Язык и чтец пользователя одним запросом (с кэшем в памяти)."""
+    ctx = user_cache.get(user_id)
+    if ctx is not None:
+        return ctx
+
+    row = await db.fetchrow(
+        """
+        SELECT us.language, r.id, r.identifier, r.name, r.name_ru, r.is_active
+        FROM user_settings us LEFT JOIN reciters r ON r.id = us.reciter_id
+        WHERE us.user_id = $1
+        """,
+        user_id,
+    )
+    if row is None:
+        ctx = UserContext(language=None, reciter=None)
+    else:
+        reciter = None
+        if row["id"] is not None:
+            reciter = Reciter(
+                id=row["id"], identifier=row["identifier"], name=row["name"],
+                name_ru=row["name_ru"], is_active=row["is_active"],
+            )
+        ctx = UserContext(language=row["language"], reciter=reciter)
+
+    user_cache.set(user_id, ctx)
+    return ctx
 
 
 # ---------- Blocked ----------
 
-async def get_all_active_user_ids(db: asyncpg.Pool) -> list[int]:
-    rows = await db.fetch("SELECT user_id FROM user_settings WHERE is_blocked = 0")
-    return [row["user_id"] for row in rows]
+async def iter_active_user_ids(
+    db: asyncpg.Pool,
+    after: int = 0,
+    page_size: int = 1000,
+) -> AsyncIterator[int]:
+    """Незаблокированные пользователи по возрастанию user_id, страницами (keyset)."""
+    last = after
+    while True:
+        rows = await db.fetch(
+            "SELECT user_id FROM user_settings WHERE is_blocked = 0 AND user_id > $1 "
+            "ORDER BY user_id LIMIT $2",
+            last, page_size,
+        )
+        if not rows:
+            return
+        for row in rows:
+            yield row["user_id"]
+        last = rows[-1]["user_id"]
+
 
+async def count_active_users(db: asyncpg.Pool, after: int = 0) -> int:
+    return await db.fetchval(
+        "SELECT COUNT(*) FROM user_settings WHERE is_blocked = 0 AND user_id > $1", after
+    )
 
-async def mark_user_blocked(db: asyncpg.Pool, user_id: int) -> None:
+
+async def mark_users_blocked(db: asyncpg.Pool, user_ids: list[int]) -> None:
     await db.execute(
-        "UPDATE user_settings SET is_blocked=1 WHERE user_id=$1", user_id
+        "UPDATE user_settings SET is_blocked=1 WHERE user_id = ANY($1::bigint[])", user_ids
     )
 
 
+# ---------- Broadcasts ----------
+
+async def create_broadcast(
+    db: asyncpg.Pool,
+    text: str | None,
+    src_chat_id: int | None,
+    src_message_id: int | None,
+    status_chat_id: int,
+    status_message_id: int,
+    total: int,
+) -> int:
+    return await db.fetchval(
+        """
+        INSERT INTO broadcasts
+            (text, src_chat_id, src_message_id, status_chat_id, status_message_id, total)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        RETURNING id
+        """,
+        text, src_chat_id, src_message_id, status_chat_id, status_message_id, total,
+    )
+
+
+async def save_broadcast_progress(
+    db: asyncpg.Pool,
+    broadcast_id: int,
+    last_user_id: int,
+    sent: int,
+    blocked: int,
+    failed: int,
+    done: bool = False,
+) -> None:
+    await db.execute(
+        """
+        UPDATE broadcasts SET
+            last_user_id = $2, sent = $3, blocked = $4, failed = $5,
+            done = done OR $6, updated_at = NOW()
+        WHERE id = $1
+        """,
+        broadcast_id, last_user_id, sent, blocked, failed, done,
+    )
+
+
+async def get_unfinished_broadcast(db: asyncpg.Pool) -> dict | None:
+    row = await db.fetchrow(
+        "SELECT * FROM broadcasts WHERE NOT done ORDER BY id DESC LIMIT 1"
+    )
+    return dict(row) if row else None
+
+
+async def finish_broadcasts(db: asyncpg.Pool) -> int:
+    status = await db.execute("UPDATE broadcasts SET done = TRUE, updated_at = NOW() WHERE NOT done")
+    return int(status.split()[-1])
+
+
 # ---------- Stats ----------
 
 async def get_stats(db: asyncpg.Pool) -> dict:
-    total   = await db.fetchval("SELECT COUNT(*) FROM user_settings")
-    blocked = await db.fetchval("SELECT COUNT(*) FROM user_settings WHERE is_blocked=1")
-
-    langs = [
-        (r["language"], r["n"])
-        for r in await db.fetch(
-            "SELECT language, COUNT(*) AS n FROM user_settings GROUP BY language ORDER BY n DESC"
-        )
-    ]
-
-    reciters = [
-        (r["name_ru"] or r["name"], r["n"])
-        for r in await db.fetch("""
-            SELECT r.name_ru, r.name, COUNT(*) AS n
-            FROM user_settings us
-            JOIN reciters r ON r.id = us.reciter_id
-            WHERE us.reciter_id IS NOT NULL
-            GROUP BY us.reciter_id, r.name_ru, r.name
+    """Статистика за один проход по user_settings (GROUPING SETS) + агрегат по кэшу."""
+    async with db.acquire() as conn:
+        rows = await conn.fetch("""
+            WITH agg AS (
+                SELECT
+                    language, reciter_id,
+                    GROUPING(language)   AS g_lang,
+                    GROUPING(reciter_id) AS g_rec,
+                    COUNT(*) AS n,
+                    COUNT(*) FILTER (WHERE is_blocked = 1) AS blocked
+                FROM user_settings
+                GROUP BY GROUPING SETS ((), (language), (reciter_id))
+            )
+            SELECT agg.*, r.name, r.name_ru
+            FROM agg LEFT JOIN reciters r ON r.id = agg.reciter_id
             ORDER BY n DESC
         """)
-    ]
-
-    row = await db.fetchrow("""
-        SELECT
-            COUNT(*) AS total,
-            SUM(CASE WHEN ayah_number IS NULL     THEN 1 ELSE 0 END) AS surahs,
-            SUM(CASE WHEN ayah_number IS NOT NULL THEN 1 ELSE 0 END) AS ayahs
-        FROM audio_cache
-    """)
-    cache = {
-        "total":  row["total"]  or 0,
-        "surahs": row["surahs"] or 0,
-        "ayahs":  row["ayahs"]  or 0,
-    }
+        cache_row = await conn.fetchrow("""
+            SELECT
+                COUNT(*) AS total,
+                COUNT(*) FILTER (WHERE ayah_number IS NULL)     AS surahs,
+                COUNT(*) FILTER (WHERE ayah_number IS NOT NULL) AS ayahs
+            FROM audio_cache
+        """)
+
+    total = blocked = 0
+    langs, reciters = [], []
+    for r in rows:
+        if r["g_lang"] and r["g_rec"]:
+            total, blocked = r["n"], r["blocked"]
+        elif not r["g_lang"]:
+            langs.append((r["language"], r["n"]))
+        elif r["reciter_id"] is not None:
+            reciters.append((r["name_ru"] or r["name"], r["n"]))
 
     return {
         "total":    total,
@@ -131,10 +276,60 @@ async def get_stats(db: asyncpg.Pool) -> dict:
         "active":   total - blocked,
         "langs":    langs,
         "reciters": reciters,
-        "cache":    cache,
+        "cache":    dict(cache_row),
     }
 
 
+# ---------- Quran index ----------
+
+async def get_surah_index(db: asyncpg.Pool) -> list[dict]:
+    rows = await db.fetch(
+        "SELECT number, name, name_arabic, name_translation, total_ayah FROM surahs ORDER BY number"
+    )
+    return [dict(r) for r in rows]
+
+
+async def get_ayah_index(db: asyncpg.Pool) -> list[dict]:
+    rows = await db.fetch(
+        "SELECT surah_number, ayah_number, text_ar, text_ru, text_uz FROM ayah_texts"
+    )
+    return [dict(r) for r in rows]
+
+
+async def save_quran_index(
+    db: asyncpg.Pool,
+    surahs: list[tuple],
+    ayahs: list[tuple],
+) -> None:
+    """surahs: (number, name, name_arabic, name_translation, total_ayah)
+    ayahs:  (surah_number, ayah_number, text_ar, text_ru, text_uz)"""
+    async with db.acquire() as conn:
+        async with conn.transaction():
+            await conn.executemany(
+                """
+                INSERT INTO surahs (number, name, name_arabic, name_translation, total_ayah)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (number) DO UPDATE SET
+                    name             = EXCLUDED.name,
+                    name_arabic      = EXCLUDED.name_arabic,
+                    name_translation = EXCLUDED.name_translation,
+                    total_ayah       = EXCLUDED.total_ayah
+                """,
+                surahs,
+            )
+            await conn.executemany(
+                """
+                INSERT INTO ayah_texts (surah_number, ayah_number, text_ar, text_ru, text_uz)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (surah_number, ayah_number) DO UPDATE SET
+                    text_ar = EXCLUDED.text_ar,
+                    text_ru = EXCLUDED.text_ru,
+                    text_uz = EXCLUDED.text_uz
+                """,
+                ayahs,
+            )
+
+
 # ---------- Audio cache ----------
 
 async def get_cached(
@@ -143,12 +338,61 @@ async def get_cached(
     surah_number: int,
     ayah_number: int | None,
 ) -> dict | None:
+    key = (reciter_id, surah_number, ayah_number)
+    cached = audio_cache.get(key)
+    if cached is not None:
+        CACHE_LOOKUPS.inc(result="memory")
+        return cached
+
     row = await db.fetchrow(
         "SELECT file_id, caption_ru, caption_uz, title, performer FROM audio_cache "
         "WHERE reciter_id=$1 AND surah_number=$2 AND ayah_number IS NOT DISTINCT FROM $3",
         reciter_id, surah_number, ayah_number,
     )
-    return dict(row) if row else None
+    if not row:
+        CACHE_LOOKUPS.inc(result="miss")
+        return None
+    CACHE_LOOKUPS.inc(result="db")
+    result = dict(row)
+    audio_cache.set(key, result)
+    return result
+
+
+async def get_cached_many(
+    db: asyncpg.Pool,
+    reciter_id: str,
+    keys: list[tuple[int, int | None]],
+) -> dict[tuple[int, int | None], dict]:
+    """Записи кэша для нескольких (surah, ayah): промахи LRU — одним запросом."""
+    found   = {}
+    missing = []
+    for surah_number, ayah_number in keys:
+        cached = audio_cache.get((reciter_id, surah_number, ayah_number))
+        if cached is not None:
+            found[(surah_number, ayah_number)] = cached
+        else:
+            missing.append((surah_number, ayah_number))
+    if not missing:
+        return found
+
+    rows = await db.fetch(
+        """
+        SELECT c.surah_number, c.ayah_number,
+               c.file_id, c.caption_ru, c.caption_uz, c.title, c.performer
+        FROM unnest($2::int[], $3::int[]) AS k(surah_number, ayah_number)
+        JOIN audio_cache c
+          ON c.reciter_id = $1
+         AND c.surah_number = k.surah_number
+         AND c.ayah_number IS NOT DISTINCT FROM k.ayah_number
+        """,
+        reciter_id, [s for s, _ in missing], [a for _, a in missing],
+    )
+    for r in rows:
+        result = dict(r)
+        key    = (result.pop("surah_number"), result.pop("ayah_number"))
+        audio_cache.set((reciter_id, *key), result)
+        found[key] = result
+    return found
 
 
 async def save_to_cache(
@@ -177,3 +421,93 @@ async def save_to_cache(
         reciter_id, surah_number, ayah_number,
         file_id, caption_ru, caption_uz, title, performer,
     )
+    audio_cache.set((reciter_id, surah_number, ayah_number), {
+        "file_id":    file_id,
+        "caption_ru": caption_ru,
+        "caption_uz": caption_uz,
+        "title":      title,
+        "performer":  performer,
+    })
+
+
+async def get_cached_keys(db: asyncpg.Pool, reciter_id: str) -> set[tuple[int, int | None]]:
+    """Все (surah, ayah), уже лежащие в кэше для чтеца."""
+    rows = await db.fetch(
+        "SELECT surah_number, ayah_number FROM audio_cache WHERE reciter_id=$1",
+        reciter_id,
+    )
+    return {(r["surah_number"], r["ayah_number"]) for r in rows}
+
+
+# ---------- Prewarm ----------
+
+async def get_pending_prewarm_jobs(db: asyncpg.Pool) -> list[dict]:
+    rows = await db.fetch(
+        "SELECT reciter_id, mode, surah_number, ayah_number FROM prewarm_jobs "
+        "WHERE NOT done ORDER BY reciter_id, mode"
+    )
+    return [dict(r) for r in rows]
+
+
+async def save_prewarm_job(
+    db: asyncpg.Pool,
+    reciter_id: str,
+    mode: str,
+    surah_number: int = 0,
+    ayah_number: int = 0,
+    done: bool = False,
+) -> None:
+    await db.execute(
+        """
+        INSERT INTO prewarm_jobs (reciter_id, mode, surah_number, ayah_number, done, updated_at)
+        VALUES ($1, $2, $3, $4, $5, NOW())
+        ON CONFLICT (reciter_id, mode) DO UPDATE SET
+            surah_number = EXCLUDED.surah_number,
+            ayah_number  = EXCLUDED.ayah_number,
+            done         = EXCLUDED.done,
+            updated_at   = NOW()
+        """,
+        reciter_id, mode, surah_number, ayah_number, done,
+    )
+
+
+async def cancel_prewarm_jobs(db: asyncpg.Pool) -> int:
+    status = await db.execute("UPDATE prewarm_jobs SET done=TRUE, updated_at=NOW() WHERE NOT done")
+    return int(status.split()[-1])
+
+
+# ---------- Worker leases ----------
+
+async def acquire_lease(db: asyncpg.Pool, key: str, owner: str, ttl: int) -> bool:
+    """Берёт аренду ключа, если она свободна или истекла."""
+    row = await db.fetchrow(
+        """
+        INSERT INTO audio_leases (key, owner, expires_at)
+        VALUES ($1, $2, NOW() + make_interval(secs => $3))
+        ON CONFLICT (key) DO UPDATE
+            SET owner = EXCLUDED.owner, expires_at = EXCLUDED.expires_at
+            WHERE audio_leases.expires_at < NOW()
+        RETURNING key
+        """,
+        key, owner, float(ttl),
+    )
+    return row is not None
+
+
+async def renew_lease(db: asyncpg.Pool, key: str, owner: str, ttl: int) -> None:
+    await db.execute(
+        "UPDATE audio_leases SET expires_at = NOW() + make_interval(secs => $3) "
+        "WHERE key = $1 AND owner = $2",
+        key, owner, float(ttl),
+    )
+
+
+async def release_lease(db: asyncpg.Pool, key: str, owner: str, channel: str) -> None:
+    """Освобождает аренду и будит ждущих воркеров (NOTIFY channel, key)."""
+    await db.execute(
+        """
+        WITH released AS (DELETE FROM audio_leases WHERE key = $1 AND owner = $2)
+        SELECT pg_notify($3, $1)
+        """,
+        key, owner, channel,
+    )
@@ -1,13 +1,12 @@
-import asyncio
-
-from aiogram import Router, Bot
-from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
 
 from config import ADMIN_ID
 from database.db import get_db
-from database.models import get_stats, get_all_active_user_ids, mark_user_blocked
+from database.models import audio_cache, get_all_reciters
+from services import broadcast, jobs, prewarm, profiler, stats
+from services.uploader import pool_status
 
 router = Router()
 
@@ -19,14 +18,25 @@ async def cmd_stats(message: Message) -> None:
     if message.from_user.id != ADMIN_ID:
         return
 
-    db = await get_db()
-    s  = await get_stats(db)
+    # /stats now — пересчитать немедленно, иначе берём фоновый снимок
+    force = message.text.split()[1:2] == ["now"]
+    s, taken_at, age = await stats.get_snapshot(force=force)
 
     lang_lines = "\n".join(
         f"  {LANG_FLAG.get(lang, '🌐')} {lang}: <b>{cnt}</b>"
         for lang, cnt in s["langs"]
     ) or "  —"
 
+    lru = audio_cache.stats()
+    q   = jobs.stats()
+
+    session_lines = "\n".join(
+        f"  {'🟢' if p['healthy'] and not p['flood'] else '🔴'} {p['name']}: "
+        f"в работе {p['busy']} · загружено {p['uploads']}"
+        + (f" · FloodWait {p['flood']}с" if p['flood'] else "")
+        for p in pool_status()
+    ) or "  —"
+
     reciter_lines = "\n".join(
         f"  • {name}: <b>{cnt}</b>" for name, cnt in s["reciters"]
     ) or "  —"
@@ -38,19 +48,26 @@ async def cmd_stats(message: Message) -> None:
         f"🔴 Заблокировали: <b>{s['blocked']}</b>\n\n"
         f"🌍 <b>По языкам:</b>\n{lang_lines}\n\n"
         f"🎙 <b>По чтецам:</b>\n{reciter_lines}\n\n"
-        f"💾 <b>Кэш:</b> {s['cache']['surahs']} сур · {s['cache']['ayahs']} аятов"
+        f"💾 <b>Кэш:</b> {s['cache']['surahs']} сур · {s['cache']['ayahs']} аятов\n"
+        f"⚡ <b>Память:</b> {lru['size']} записей · "
+        f"попаданий {lru['hits']} · промахов {lru['misses']}\n\n"
+        f"📥 <b>Очередь загрузок:</b> в очереди {q['queued']} · в работе {q['running']} · "
+        f"ожидание ср. {q['avg_wait']:.1f}с / макс. {q['max_wait']:.1f}с\n\n"
+        f"📡 <b>Аккаунты загрузки:</b>\n{session_lines}\n\n"
+        f"🕒 Данные на {taken_at:%H:%M:%S} ({age} с назад) · /stats now — обновить"
     )
     await message.answer(text)
 
 
 @router.message(Command("broadcast"))
-async def cmd_broadcast(message: Message, bot: Bot) -> None:
+async def cmd_broadcast(message: Message) -> None:
     if message.from_user.id != ADMIN_ID:
         return
 
     # Текст берём из reply или из самого сообщения после команды
     if message.reply_to_message:
-        src = message.reply_to_message
+        src  = message.reply_to_message
+        text = None
     else:
         text = message.text.removeprefix("/broadcast").strip()
         if not text:
@@ -63,35 +80,114 @@ async def cmd_broadcast(message: Message, bot: Bot) -> None:
             return
         src = None
 
+    if await broadcast.is_active():
+        await message.answer("Рассылка уже идёт — /broadcast_stop чтобы остановить")
+        return
+
+    status = await message.answer("📤 Начинаю рассылку...")
+    await broadcast.start(status, text=text, src=src)
+
+
+@router.message(Command("broadcast_stop"))
+async def cmd_broadcast_stop(message: Message) -> None:
+    if message.from_user.id != ADMIN_ID:
+        return
+    if not await broadcast.stop():
+        await message.answer("Рассылка не запущена")
+
+
+@router.message(Command("prewarm"))
+async def cmd_prewarm(message: Message) -> None:
+    if message.from_user.id != ADMIN_ID:
+        return
+
+    args = message.text.split()[1:]
+
+    if args and args[0] == "stop":
+        stopped = await prewarm.stop()
+        await message.answer("⏹ Прогрев остановлен" if stopped else "Прогрев не запущен")
+        return
+
+    if not args or args[0] == "status":
+        if not prewarm.is_running() and await prewarm.pending_jobs():
+            await message.answer("🔥 Прогрев идёт на другом воркере — /prewarm stop чтобы остановить")
+            return
+        if not prewarm.is_running():
+            await message.answer(
+                "Прогрев не запущен.\n\n"
+                "Использование:\n"
+                "• <code>/prewarm all [surahs|ayahs]</code>\n"
+                "• <code>/prewarm ID_чтеца [surahs|ayahs]</code>\n"
+                "• <code>/prewarm status</code> · <code>/prewarm stop</code>",
+                parse_mode="HTML",
+            )
+            return
+        p = prewarm.status()
+        await message.answer(
+            f"🔥 <b>Прогрев кэша</b>\n\n"
+            f"🎙 {p.get('reciter', '—')} · {p.get('mode', '—')}\n"
+            f"📦 Задача {p['finished_jobs'] + 1} из {p['jobs']}\n"
+            f"✅ Загружено: <b>{p.get('done', 0)}</b> из {p.get('total', 0)}\n"
+            f"⚠️ Ошибки: <b>{p['failed']}</b>",
+            parse_mode="HTML",
+        )
+        return
+
+    if prewarm.is_running() or await prewarm.pending_jobs():
+        await message.answer("Прогрев уже идёт — /prewarm status")
+        return
+
+    mode = args[1] if len(args) > 1 else "surahs"
+    if mode not in prewarm.MODES:
+        await message.answer("Режим: <code>surahs</code> или <code>ayahs</code>", parse_mode="HTML")
+        return
+
     db       = await get_db()
-    user_ids = await get_all_active_user_ids(db)
-    total    = len(user_ids)
-
-    status = await message.answer(f"📤 Начинаю рассылку — {total} пользователей...")
-
-    ok = blocked = failed = 0
-
-    for user_id in user_ids:
-        try:
-            if src:
-                await src.copy_to(user_id)
-            else:
-                await bot.send_message(user_id, text, parse_mode="HTML")
-            ok += 1
-        except TelegramForbiddenError:
-            await mark_user_blocked(db, user_id)
-            blocked += 1
-        except (TelegramBadRequest, Exception):
-            failed += 1
-
-        # ~25 сообщений/сек — не превышаем flood limit
-        await asyncio.sleep(0.04)
-
-    await status.edit_text(
-        f"✅ Рассылка завершена\n\n"
-        f"📨 Отправлено: <b>{ok}</b>\n"
-        f"🔴 Заблокировали: <b>{blocked}</b>\n"
-        f"⚠️ Ошибки: <b>{failed}</b>\n"
-        f"👥 Всего: <b>{total}</b>",
+    reciters = await get_all_reciters(db)
+    if args[0] != "all":
+        reciters = [r for r in reciters if str(r.id) == args[0]]
+        if not reciters:
+            await message.answer("Чтец не найден")
+            return
+
+    await prewarm.start(reciters, mode)
+    await message.answer(
+        f"🔥 Прогрев запущен: {len(reciters)} чтец(ов), режим <b>{mode}</b>\n"
+        f"Прогресс — /prewarm status",
         parse_mode="HTML",
     )
+
+
+@router.message(Command("profile"))
+async def cmd_profile(message: Message) -> None:
+    if message.from_user.id != ADMIN_ID:
+        return
+
+    args = message.text.split()[1:]
+
+    if args and args[0] == "stop":
+        stopped = profiler.disarm()
+        await message.answer("⏹ Профилирование остановлено" if stopped else "Профилирование не запущено")
+        return
+
+    if not args:
+        done, left = profiler.status()
+        if left:
+            await message.answer(f"🧪 Профилирование: снято {done}, осталось {left}")
+        else:
+            await message.answer(
+                "Использование:\n"
+                "• <code>/profile N</code> — cProfile для следующих N обновлений\n"
+                "• <code>/profile stop</code>",
+                parse_mode="HTML",
+            )
+        return
+
+    if not args[0].isdigit() or not 1 <= int(args[0]) <= 1000:
+        await message.answer("N — число от 1 до 1000")
+        return
+
+    if not profiler.arm(int(args[0]), message.chat.id):
+        await message.answer("🧪 Профилирование уже идёт — дождитесь отчёта или /profile stop")
+        return
+    await message.answer(f"🧪 Профилирую следующие {args[0]} обновлений — отчёт придёт сюда")
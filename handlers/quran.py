@@ -1,13 +1,18 @@
+import asyncio
 import re
-import aiohttp
+from functools import lru_cache
+
 from aiohttp import ClientResponseError
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InputMediaAudio
 
+from config import RENDER_CACHE_SIZE
 from database.db import get_db
-from database.models import get_user_reciter, get_user_language, get_cached, save_to_cache
-from services.quran_api import get_surah, get_ayah
-from services.uploader import upload_audio, download_to_tempfile
+from database.models import get_user_context, get_cached, get_cached_many
+from metrics import Gauge
+from services import jobs, prefetch
+from services.audio import load_surah, load_ayah, UploadError
+from services.quran_meta import is_valid_surah, is_valid_ayah
 from keyboards.keyboards import nav_kb
 from locales import t
 
@@ -15,8 +20,10 @@ router = Router()
 
 RE_SURAH = re.compile(r"^\d{1,3}$")
 RE_AYAH  = re.compile(r"^(\d{1,3}):(\d{1,3})$")
-MAX_SURAH = 114
-MAX_TEXT  = 4096
+RE_RANGE = re.compile(r"^(\d{1,3}):(\d{1,3})\s*-\s*(\d{1,3})$")
+MAX_TEXT    = 4096
+MAX_RANGE   = 30   # аятов в одном запросе «2:1-10»
+MEDIA_GROUP = 10   # предел sendMediaGroup
 
 
 @router.message(~F.via_bot)
@@ -25,21 +32,43 @@ async def handle_quran_query(message: Message) -> None:
     if not text:
         return
 
-    db = await get_db()
-    lang    = await get_user_language(db, message.from_user.id) or "ru"
-    reciter = await get_user_reciter(db, message.from_user.id)
+    db      = await get_db()
+    ctx     = await get_user_context(db, message.from_user.id)
+    lang    = ctx.language or "ru"
+    reciter = ctx.reciter
 
     if not reciter:
         await message.answer(t(lang, "no_reciter"), parse_mode="HTML")
         return
 
-    if m := RE_AYAH.match(text):
+    if m := RE_RANGE.match(text):
+        surah_n, first, last = map(int, m.groups())
+        if not is_valid_surah(surah_n):
+            await message.answer(t(lang, "bad_surah"))
+            return
+        for ayah_n in (first, last):
+            if not is_valid_ayah(surah_n, ayah_n):
+                await message.answer(t(lang, "ayah_not_found", surah=surah_n, ayah=ayah_n), parse_mode="HTML")
+                return
+        first, last = min(first, last), max(first, last)
+        if last - first + 1 > MAX_RANGE:
+            await message.answer(t(lang, "range_too_long", max=MAX_RANGE))
+            return
+        await _send_range(message, surah_n, first, last, reciter, lang)
+
+    elif m := RE_AYAH.match(text):
         surah_n, ayah_n = int(m.group(1)), int(m.group(2))
+        if not is_valid_surah(surah_n):
+            await message.answer(t(lang, "bad_surah"))
+            return
+        if not is_valid_ayah(surah_n, ayah_n):
+            await message.answer(t(lang, "ayah_not_found", surah=surah_n, ayah=ayah_n), parse_mode="HTML")
+            return
         await _send_ayah(message, surah_n, ayah_n, reciter, lang)
 
     elif RE_SURAH.match(text):
         surah_n = int(text)
-        if not 1 <= surah_n <= MAX_SURAH:
+        if not is_valid_surah(surah_n):
             await message.answer(t(lang, "bad_surah"))
             return
         await _send_surah(message, surah_n, reciter, lang)
@@ -56,21 +85,37 @@ async def nav_callback(callback: CallbackQuery) -> None:
     if parts[1] == "none":
         return
 
+    # Кнопки старых сообщений могут указывать на несуществующий аят
+    try:
+        surah_n = int(parts[2])
+        ayah_n  = int(parts[3]) if parts[1] == "a" else None
+    except (IndexError, ValueError):
+        return
+    valid = is_valid_ayah(surah_n, ayah_n) if ayah_n is not None else is_valid_surah(surah_n)
+
     db      = await get_db()
-    lang    = await get_user_language(db, callback.from_user.id) or "ru"
-    reciter = await get_user_reciter(db, callback.from_user.id)
+    ctx     = await get_user_context(db, callback.from_user.id)
+    lang    = ctx.language or "ru"
+    reciter = ctx.reciter
 
     if not reciter:
         await callback.message.answer(t(lang, "no_reciter"), parse_mode="HTML")
         return
 
+    if not valid:
+        if ayah_n is None:
+            await callback.message.answer(t(lang, "bad_surah"))
+        else:
+            await callback.message.answer(t(lang, "ayah_not_found", surah=surah_n, ayah=ayah_n), parse_mode="HTML")
+        return
+
     # Удаляем текущий текст с кнопками — появится новый
     await callback.message.delete()
 
     if parts[1] == "s":
-        await _send_surah(callback.message, int(parts[2]), reciter, lang)
+        await _send_surah(callback.message, surah_n, reciter, lang)
     elif parts[1] == "a":
-        await _send_ayah(callback.message, int(parts[2]), int(parts[3]), reciter, lang)
+        await _send_ayah(callback.message, surah_n, ayah_n, reciter, lang)
 
 
 # ─── helpers ────────────────────────────────────────────────────────────────
@@ -79,61 +124,70 @@ async def _send_audio(message: Message, file_id: str, title: str, performer: str
     await message.answer_audio(audio=file_id, title=title, performer=performer)
 
 
-async def _send_text(message: Message, text: str, markup: InlineKeyboardMarkup) -> None:
-    for i in range(0, len(text), MAX_TEXT):
-        kb = markup if i + MAX_TEXT >= len(text) else None
-        await message.answer(text[i:i + MAX_TEXT], parse_mode="HTML", reply_markup=kb)
+def _split(caption: str, markup: InlineKeyboardMarkup) -> tuple[tuple[str, InlineKeyboardMarkup | None], ...]:
+    """Подпись, нарезанная по MAX_TEXT, с клавиатурой под последним куском."""
+    return tuple(
+        (caption[i:i + MAX_TEXT], markup if i + MAX_TEXT >= len(caption) else None)
+        for i in range(0, len(caption), MAX_TEXT)
+    )
 
 
-# ─── surah ──────────────────────────────────────────────────────────────────
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render(
+    mode: str, surah_n: int, ayah_n: int | None, lang: str, reciter_id: int, caption: str,
+) -> tuple[tuple[str, InlineKeyboardMarkup | None], ...]:
+    """_split с навигацией для одной суры или аята — готовый ответ горячего пути.
+    Один и тот же InlineKeyboardMarkup отдаётся всем запросам, а он изменяемый
+    (frozen=False, как и кнопки): вызывающие только передают его в reply_markup
+    и никогда не меняют — правка испортила бы ответ всем следующим.
+    Собирать клавиатуру на каждый ответ — ~0.1 мс, ради этого кэш и нужен.
+    Строки audio_cache не меняются, а подпись — часть ключа (хэш str кэшируется)."""
+    return _split(caption, nav_kb(mode, surah_n, ayah_n, lang=lang, reciter_id=reciter_id))
 
-async def _send_surah(message: Message, surah_n: int, reciter, lang: str) -> None:
-    db     = await get_db()
-    cached = await get_cached(db, reciter.identifier, surah_n, None)
 
-    if cached:
-        await _send_audio(message, cached["file_id"], cached["title"], cached["performer"])
-        caption = cached["caption_ru"] if lang == "ru" else cached["caption_uz"]
-        await _send_text(message, caption, nav_kb("surah", surah_n, lang=lang))
-        return
+Gauge("render_cache_entries", "Prebuilt caption/keyboard replies in memory",
+      lambda: _render.cache_info().currsize)
+Gauge("render_cache_hits_total", "Hits of the prebuilt reply cache",
+      lambda: _render.cache_info().hits, kind="counter")
 
-    wait_msg = await message.answer(t(lang, "loading_surah"))
-    try:
-        async with aiohttp.ClientSession() as session:
-            info = await get_surah(session, surah_n, reciter.identifier)
-        filepath = await download_to_tempfile(info.audio_url)
-    except Exception as e:
-        await wait_msg.delete()
-        await message.answer(t(lang, "loading_error", e=e))
-        return
 
-    title     = f"Sura {info.surah_number} - {info.name_arabic} ({info.name})"
-    performer = reciter.display_name
-    filename  = f"Sura {info.surah_number} - {info.name} - {performer}.mp3"
+async def _send_text(message: Message, parts: tuple[tuple[str, InlineKeyboardMarkup | None], ...]) -> None:
+    # parts может быть из _render: клавиатуры общие, только читаем
+    for text, kb in parts:
+        await message.answer(text, parse_mode="HTML", reply_markup=kb)
 
-    caption_ru = t("ru", "surah_caption",
-        number=info.surah_number, arabic=info.name_arabic,
-        name=info.name, reciter=performer,
-        translation=info.name_translation, total=info.total_ayah)
-    caption_uz = t("uz", "surah_caption",
-        number=info.surah_number, arabic=info.name_arabic,
-        name=info.name, reciter=performer,
-        translation=info.name_translation, total=info.total_ayah)
 
-    try:
-        file_id = await upload_audio(filepath, filename, title=title, performer=performer)
-    except Exception as e:
-        await wait_msg.delete()
-        await message.answer(t(lang, "upload_error", e=e))
-        return
+# ─── surah ──────────────────────────────────────────────────────────────────
 
-    await save_to_cache(db, reciter.identifier, surah_n, None,
-                        file_id, caption_ru, caption_uz, title, performer)
-    await wait_msg.delete()
+async def _send_surah(message: Message, surah_n: int, reciter, lang: str) -> None:
+    db     = await get_db()
+    cached = await get_cached(db, reciter.identifier, surah_n, None)
+
+    if not cached:
+        wait_msg = await message.answer(t(lang, "loading_surah"))
+        try:
+            cached = await jobs.submit(
+                message.chat.id, (reciter.identifier, surah_n, None),
+                lambda: load_surah(reciter, surah_n),
+                on_queued=lambda pos: wait_msg.edit_text(t(lang, "queued", position=pos)),
+            )
+        except jobs.QueueFull:
+            await wait_msg.edit_text(t(lang, "queue_full"))
+            return
+        except UploadError as e:
+            await wait_msg.delete()
+            await message.answer(t(lang, "upload_error", e=e.__cause__))
+            return
+        except Exception as e:
+            await wait_msg.delete()
+            await message.answer(t(lang, "loading_error", e=e))
+            return
+        await wait_msg.delete()
 
-    caption = caption_ru if lang == "ru" else caption_uz
-    await _send_audio(message, file_id, title, performer)
-    await _send_text(message, caption, nav_kb("surah", surah_n, lang=lang))
+    await _send_audio(message, cached["file_id"], cached["title"], cached["performer"])
+    caption = cached["caption_ru"] if lang == "ru" else cached["caption_uz"]
+    await _send_text(message, _render("surah", surah_n, None, lang, reciter.id, caption))
+    prefetch.schedule(reciter, surah_n)
 
 
 # ─── ayah ───────────────────────────────────────────────────────────────────
@@ -142,51 +196,84 @@ async def _send_ayah(message: Message, surah_n: int, ayah_n: int, reciter, lang:
     db     = await get_db()
     cached = await get_cached(db, reciter.identifier, surah_n, ayah_n)
 
-    if cached:
-        await _send_audio(message, cached["file_id"], cached["title"], cached["performer"])
-        caption = cached["caption_ru"] if lang == "ru" else cached["caption_uz"]
-        await _send_text(message, caption, nav_kb("ayah", surah_n, ayah_n, lang=lang))
-        return
-
-    wait_msg = await message.answer(t(lang, "loading_ayah"))
-    try:
-        async with aiohttp.ClientSession() as session:
-            ayah = await get_ayah(session, surah_n, ayah_n, reciter.identifier)
-        filepath = await download_to_tempfile(ayah.audio_url)
-    except ClientResponseError as e:
-        await wait_msg.delete()
-        if e.status == 404:
-            await message.answer(t(lang, "ayah_not_found", surah=surah_n, ayah=ayah_n), parse_mode="HTML")
-        else:
+    if not cached:
+        wait_msg = await message.answer(t(lang, "loading_ayah"))
+        try:
+            cached = await jobs.submit(
+                message.chat.id, (reciter.identifier, surah_n, ayah_n),
+                lambda: load_ayah(reciter, surah_n, ayah_n),
+                on_queued=lambda pos: wait_msg.edit_text(t(lang, "queued", position=pos)),
+            )
+        except jobs.QueueFull:
+            await wait_msg.edit_text(t(lang, "queue_full"))
+            return
+        except UploadError as e:
+            await wait_msg.delete()
+            await message.answer(t(lang, "upload_error", e=e.__cause__))
+            return
+        except ClientResponseError as e:
+            await wait_msg.delete()
+            if e.status == 404:
+                await message.answer(t(lang, "ayah_not_found", surah=surah_n, ayah=ayah_n), parse_mode="HTML")
+            else:
+                await message.answer(t(lang, "ayah_error", e=e))
+            return
+        except Exception as e:
+            await wait_msg.delete()
             await message.answer(t(lang, "ayah_error", e=e))
-        return
-    except Exception as e:
+            return
         await wait_msg.delete()
-        await message.answer(t(lang, "ayah_error", e=e))
-        return
 
-    title     = f"{ayah.surah_name} {surah_n}:{ayah_n}"
-    performer = reciter.display_name
-    filename  = f"{ayah.surah_name} {surah_n}-{ayah_n} - {performer}.mp3"
+    await _send_audio(message, cached["file_id"], cached["title"], cached["performer"])
+    caption = cached["caption_ru"] if lang == "ru" else cached["caption_uz"]
+    await _send_text(message, _render("ayah", surah_n, ayah_n, lang, reciter.id, caption))
+    prefetch.schedule(reciter, surah_n, ayah_n)
 
-    caption_ru = t("ru", "ayah_caption",
-        surah_name=ayah.surah_name, surah=surah_n, ayah=ayah_n,
-        reciter=performer, translation=ayah.russian_text)
-    caption_uz = t("uz", "ayah_caption",
-        surah_name=ayah.surah_name, surah=surah_n, ayah=ayah_n,
-        reciter=performer, translation=ayah.uzbek_text)
 
-    try:
-        file_id = await upload_audio(filepath, filename, title=title, performer=performer)
-    except Exception as e:
-        await wait_msg.delete()
-        await message.answer(t(lang, "upload_error", e=e))
-        return
+# ─── range ──────────────────────────────────────────────────────────────────
 
-    await save_to_cache(db, reciter.identifier, surah_n, ayah_n,
-                        file_id, caption_ru, caption_uz, title, performer)
-    await wait_msg.delete()
-
-    caption = caption_ru if lang == "ru" else caption_uz
-    await _send_audio(message, file_id, title, performer)
-    await _send_text(message, caption, nav_kb("ayah", surah_n, ayah_n, lang=lang))
+async def _send_range(message: Message, surah_n: int, first: int, last: int, reciter, lang: str) -> None:
+    """Отрывок «2:1-10»: закэшированные аяты — одним запросом к БД, недостающие
+    загружаются параллельно через очередь, аудио уходит альбомами по MEDIA_GROUP."""
+    db     = await get_db()
+    keys   = [(surah_n, a) for a in range(first, last + 1)]
+    found  = await get_cached_many(db, reciter.identifier, keys)
+    missing = [a for _, a in keys if (surah_n, a) not in found]
+    failed: list[int] = []
+
+    if missing:
+        wait_msg = await message.answer(t(lang, "loading_range", count=len(missing)))
+        results = await asyncio.gather(*(
+            jobs.submit(
+                message.chat.id, (reciter.identifier, surah_n, a),
+                lambda a=a: load_ayah(reciter, surah_n, a),
+            )
+            for a in missing
+        ), return_exceptions=True)
+        await wait_msg.delete()
+        for a, result in zip(missing, results):
+            if isinstance(result, BaseException):
+                failed.append(a)
+            else:
+                found[(surah_n, a)] = result
+
+    rows = [(a, found[(surah_n, a)]) for _, a in keys if (surah_n, a) in found]
+    for i in range(0, len(rows), MEDIA_GROUP):
+        batch = [row for _, row in rows[i:i + MEDIA_GROUP]]
+        if len(batch) == 1:  # альбом — от 2 элементов
+            await _send_audio(message, batch[0]["file_id"], batch[0]["title"], batch[0]["performer"])
+            continue
+        await message.answer_media_group([
+            InputMediaAudio(media=row["file_id"], title=row["title"], performer=row["performer"])
+            for row in batch
+        ])
+
+    if rows:
+        field   = "caption_ru" if lang == "ru" else "caption_uz"
+        caption = "\n\n".join(row[field] for _, row in rows)
+        # Не через _render: разовые подписи отрывков вытесняли бы горячие ответы
+        markup  = nav_kb("ayah", surah_n, rows[-1][0], lang=lang, reciter_id=reciter.id)
+        await _send_text(message, _split(caption, markup))
+    if failed:
+        await message.answer(t(lang, "range_failed", ayahs=", ".join(f"{surah_n}:{a}" for a in failed)))
+    prefetch.schedule(reciter, surah_n, last)
@@ -7,27 +7,37 @@ from aiogram.types import (
 from database.db import get_db
 from database.models import (
     get_all_reciters, set_user_reciter, get_reciter_by_id,
-    get_user_language, get_user_reciter, get_cached,
+    get_user_language, get_user_context, get_cached, get_cached_many,
 )
-from locales import t
+from locales import t, TEXTS
+from services.quran_search import search
 
 router = Router()
 
 MAX_CAPTION = 1024
 
+# Ответы, не зависящие от пользователя, Telegram кэширует у себя
+RECITERS_CACHE_TIME = 300      # список чтецов меняется редко
+SHARE_CACHE_TIME    = 86400    # записи audio_cache не меняются
+SEARCH_CACHE_TIME   = 30       # зависит от чтеца и языка пользователя
+
+# Текст кнопки «выбрать чтеца» на всех языках — это запрос списка чтецов
+RECITER_QUERIES = {texts["inline_query_text"] for texts in TEXTS.values()}
+
 
 @router.inline_query()
 async def inline_handler(query: InlineQuery) -> None:
-    if query.query.startswith("share:"):
+    text = query.query.strip()
+    if text.startswith("share:"):
         await _handle_share(query)
+    elif text and text not in RECITER_QUERIES:
+        await _handle_search(query, text)
     else:
         await _handle_reciters(query)
 
 
 async def _handle_reciters(query: InlineQuery) -> None:
-    db      = await get_db()
-    reciters = await get_all_reciters(db)
-    lang    = await get_user_language(db, query.from_user.id) or "ru"
+    reciters = await get_all_reciters(await get_db())
 
     results = []
     for reciter in reciters:
@@ -45,33 +55,42 @@ async def _handle_reciters(query: InlineQuery) -> None:
             ),
         ))
 
-    await query.answer(results, cache_time=60, is_personal=True)
+    # Список одинаков для всех — выбор чтеца приходит через chosen_inline_result
+    await query.answer(results, cache_time=RECITERS_CACHE_TIME, is_personal=False)
 
 
 async def _handle_share(query: InlineQuery) -> None:
-    # query format: share:s:{surah}  or  share:a:{surah}:{ayah}
+    # query format: share:{reciter_id}:{lang}:s:{surah}  or  share:{reciter_id}:{lang}:a:{surah}:{ayah}
+    # Старые кнопки без чтеца и языка: share:s:{surah}, share:a:{surah}:{ayah}
     parts = query.query.split(":")
-    db      = await get_db()
-    lang    = await get_user_language(db, query.from_user.id) or "ru"
-    reciter = await get_user_reciter(db, query.from_user.id)
+    db    = await get_db()
+
+    if len(parts) > 1 and parts[1].isdigit():
+        reciter  = await get_reciter_by_id(db, int(parts[1]))
+        lang     = parts[2] if len(parts) > 2 else "ru"
+        target   = parts[3:]
+        personal = False
+    else:
+        ctx      = await get_user_context(db, query.from_user.id)
+        reciter  = ctx.reciter
+        lang     = ctx.language or "ru"
+        target   = parts[1:]
+        personal = True
 
     if not reciter:
         await query.answer([], cache_time=0)
         return
 
     try:
-        if parts[1] == "s":
-            surah_n = int(parts[2])
-            cached  = await get_cached(db, reciter.identifier, surah_n, None)
-        else:
-            surah_n = int(parts[2])
-            ayah_n  = int(parts[3])
-            cached  = await get_cached(db, reciter.identifier, surah_n, ayah_n)
+        surah_n = int(target[1])
+        ayah_n  = int(target[2]) if target[0] == "a" else None
     except (IndexError, ValueError):
         await query.answer([], cache_time=0)
         return
 
+    cached = await get_cached(db, reciter.identifier, surah_n, ayah_n)
     if not cached:
+        # Не кэшируем пустой ответ — файл может появиться через минуту
         await query.answer([], cache_time=0)
         return
 
@@ -83,7 +102,39 @@ async def _handle_share(query: InlineQuery) -> None:
         caption=caption[:MAX_CAPTION],
         parse_mode="HTML",
     )
-    await query.answer([result], cache_time=0, is_personal=True)
+    if personal:
+        await query.answer([result], cache_time=0, is_personal=True)
+    else:
+        await query.answer([result], cache_time=SHARE_CACHE_TIME, is_personal=False)
+
+
+async def _handle_search(query: InlineQuery, text: str) -> None:
+    """«36», «2:255», «yasin» — готовые аудио выбранного чтеца из audio_cache."""
+    found = search(text)
+    db    = await get_db()
+    ctx   = await get_user_context(db, query.from_user.id) if found else None
+
+    if not found or not ctx.reciter:
+        await query.answer([], cache_time=SEARCH_CACHE_TIME, is_personal=True)
+        return
+
+    lang   = ctx.language or "ru"
+    cached = await get_cached_many(db, ctx.reciter.identifier, found)
+
+    results = []
+    for surah_n, ayah_n in found:
+        row = cached.get((surah_n, ayah_n))
+        if not row:
+            continue  # некэшированное аудио inline не отдать — только через бота
+        caption = row["caption_ru"] if lang == "ru" else row["caption_uz"]
+        results.append(InlineQueryResultCachedAudio(
+            id=f"{surah_n}:{ayah_n or 0}",
+            audio_file_id=row["file_id"],
+            caption=caption[:MAX_CAPTION],
+            parse_mode="HTML",
+        ))
+
+    await query.answer(results, cache_time=SEARCH_CACHE_TIME, is_personal=True)
 
 
 @router.chosen_inline_result()
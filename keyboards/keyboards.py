@@ -1,5 +1,6 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, SwitchInlineQueryChosenChat
 from locales import t
+from services.quran_meta import MAX_SURAH, next_ayah, prev_ayah
 
 
 def language_kb() -> InlineKeyboardMarkup:
@@ -18,22 +19,29 @@ def main_menu_kb(lang: str) -> InlineKeyboardMarkup:
     ]])
 
 
-def nav_kb(mode: str, surah_n: int, ayah_n: int = None, lang: str = "ru") -> InlineKeyboardMarkup:
+def nav_kb(mode: str, surah_n: int, ayah_n: int = None, lang: str = "ru",
+           reciter_id: int = None) -> InlineKeyboardMarkup:
     """Навигация под текстовым сообщением.
     mode = 'surah' | 'ayah'
+    Чтец и язык зашиваются в запрос «поделиться» — ответ на него одинаков для
+    всех и кэшируется Telegram'ом.
     """
+    share_prefix = f"share:{reciter_id}:{lang}" if reciter_id else "share"
     if mode == "surah":
         prev_txt = f"◀️ {surah_n - 1}" if surah_n > 1    else "◀️"
         prev_cb  = f"nav:s:{surah_n - 1}" if surah_n > 1 else "nav:none"
-        next_txt = f"{surah_n + 1} ▶️" if surah_n < 114  else "▶️"
-        next_cb  = f"nav:s:{surah_n + 1}" if surah_n < 114 else "nav:none"
-        share_q  = f"share:s:{surah_n}"
+        next_txt = f"{surah_n + 1} ▶️" if surah_n < MAX_SURAH  else "▶️"
+        next_cb  = f"nav:s:{surah_n + 1}" if surah_n < MAX_SURAH else "nav:none"
+        share_q  = f"{share_prefix}:s:{surah_n}"
     else:
-        prev_txt = f"◀️ {surah_n}:{ayah_n - 1}" if ayah_n > 1 else "◀️"
-        prev_cb  = f"nav:a:{surah_n}:{ayah_n - 1}" if ayah_n > 1 else "nav:none"
-        next_txt = f"{surah_n}:{ayah_n + 1} ▶️"
-        next_cb  = f"nav:a:{surah_n}:{ayah_n + 1}"
-        share_q  = f"share:a:{surah_n}:{ayah_n}"
+        # На границах суры переходим к соседней суре
+        prev = prev_ayah(surah_n, ayah_n)
+        nxt  = next_ayah(surah_n, ayah_n)
+        prev_txt = f"◀️ {prev[0]}:{prev[1]}" if prev else "◀️"
+        prev_cb  = f"nav:a:{prev[0]}:{prev[1]}" if prev else "nav:none"
+        next_txt = f"{nxt[0]}:{nxt[1]} ▶️" if nxt else "▶️"
+        next_cb  = f"nav:a:{nxt[0]}:{nxt[1]}" if nxt else "nav:none"
+        share_q  = f"{share_prefix}:a:{surah_n}:{ayah_n}"
 
     return InlineKeyboardMarkup(inline_keyboard=[
         [
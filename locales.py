@@ -40,6 +40,8 @@ TEXTS = {
 
         "loading_surah":      "⏳ Загружаю суру, подождите...",
         "loading_ayah":       "⏳ Загружаю аят, подождите...",
+        "queued":             "⏳ Вы в очереди, позиция {position}. Аудио придёт автоматически.",
+        "queue_full":         "⚠️ Сейчас слишком много запросов. Попробуйте через минуту.",
         "loading_error":      "⚠️ Ошибка скачивания: {e}",
         "upload_error":       "⚠️ Ошибка загрузки в хранилище: {e}",
         "ayah_not_found":     "❌ Аят <b>{surah}:{ayah}</b> не найден.\nПроверьте номер — возможно, в этой суре меньше аятов.",
@@ -52,8 +54,12 @@ TEXTS = {
         "bad_format": (
             "❓ Формат не распознан. Примеры:\n"
             "• <code>3</code> — сура целиком\n"
-            "• <code>6:12</code> — конкретный аят"
+            "• <code>6:12</code> — конкретный аят\n"
+            "• <code>2:1-10</code> — аяты с 1 по 10"
         ),
+        "loading_range":      "⏳ Загружаю аяты ({count}), подождите...",
+        "range_too_long":     "⚠️ За один раз — не больше {max} аятов.",
+        "range_failed":       "⚠️ Не удалось загрузить аяты: {ayahs}",
 
         # caption шаблоны
         "surah_caption": (
@@ -107,6 +113,8 @@ TEXTS = {
 
         "loading_surah":      "⏳ Sura yuklanmoqda, kuting...",
         "loading_ayah":       "⏳ Oyat yuklanmoqda, kuting...",
+        "queued":             "⏳ Siz navbatdasiz, o'rningiz: {position}. Audio avtomatik yuboriladi.",
+        "queue_full":         "⚠️ Hozir so'rovlar juda ko'p. Bir daqiqadan so'ng urinib ko'ring.",
         "loading_error":      "⚠️ Yuklab olishda xato: {e}",
         "upload_error":       "⚠️ Saqlashda xato: {e}",
         "ayah_not_found":     "❌ <b>{surah}:{ayah}</b> oyati topilmadi.\nShu surada buncha oyat yo'q bo'lishi mumkin.",
@@ -119,8 +127,12 @@ TEXTS = {
         "bad_format": (
             "❓ Format aniqlanmadi. Misollar:\n"
             "• <code>3</code> — to'liq sura\n"
-            "• <code>6:12</code> — aniq oyat"
+            "• <code>6:12</code> — aniq oyat\n"
+            "• <code>2:1-10</code> — 1 dan 10 gacha oyatlar"
         ),
+        "loading_range":      "⏳ Oyatlar yuklanmoqda ({count}), kuting...",
+        "range_too_long":     "⚠️ Bir martada {max} tadan ko'p oyat so'rab bo'lmaydi.",
+        "range_failed":       "⚠️ Oyatlarni yuklab bo'lmadi: {ayahs}",
 
         "surah_caption": (
             "📖 <b>Sura {number} — {arabic} ({name})</b>\n"
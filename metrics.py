@@ -0,0 +1,142 @@
+"""
+Метрики в текстовом формате Prometheus (отдаются на /metrics API мини-аппа).
+Свой минимальный реестр вместо prometheus_client: счётчики, гистограммы и
+значения, вычисляемые в момент запроса (размер кэша, пул БД, очередь).
+"""
+import functools
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: tuple[tuple[str, str], ...], **extra) -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in (*labels, *extra.items())]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str) -> None:
+        self.name   = name
+        self.help   = help
+        self._values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def sum(self, **match: str) -> float:
+        """Сумма по всем сериям, у которых совпадают указанные метки."""
+        items = match.items()
+        return sum(v for labels, v in self._values.items() if items <= set(labels))
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_fmt_labels(labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name    = name
+        self.help    = help
+        self.buckets = buckets
+        # labels -> [счётчики по корзинам (+Inf последней), сумма]
+        self._values: dict[tuple, list] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key   = tuple(sorted(labels.items()))
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def count(self) -> int:
+        """Число наблюдений по всем сериям."""
+        return sum(sum(counts) for counts, _ in self._values.values())
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_fmt_labels(labels, le=bound)} {cumulative}"
+            yield f"{self.name}_sum{_fmt_labels(labels)} {total}"
+            yield f"{self.name}_count{_fmt_labels(labels)} {cumulative}"
+
+
+class Gauge:
+    """Значение считается при каждом запросе /metrics.
+    fn возвращает число или {(("label", "value"), ...): число}."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float | dict],
+                 kind: str = "gauge") -> None:
+        self.name = name
+        self.help = help
+        self.fn   = fn
+        self.kind = kind
+        _registry.append(self)
+
+    def render(self) -> Iterator[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for labels, v in items:
+            yield f"{self.name}{_fmt_labels(labels)} {v}"
+
+
+def timed(histogram: Histogram, **labels: str):
+    """Декоратор для корутин: длительность вызова в histogram."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ─── метрики бота ───────────────────────────────────────────────────────────
+
+UPDATES       = Counter("bot_updates_total", "Handled updates by handler and outcome")
+HANDLER_TIME  = Histogram("bot_handler_seconds", "Handler latency by handler")
+CACHE_LOOKUPS = Counter("audio_cache_lookups_total", "get_cached lookups by result (memory, db, miss)")
+QURAN_API     = Histogram("quran_api_seconds", "Quran API call latency by call")
+DOWNLOAD_TIME = Histogram("audio_download_seconds", "Audio download to a temp file")
+UPLOAD_TIME   = Histogram("audio_upload_seconds", "Upload to the storage channel by mode (stream, file)")
+UPLOADS       = Counter("audio_uploads_total", "Uploads to the storage channel by mode and result")
+DB_QUERY_TIME = Histogram("db_query_seconds", "PostgreSQL query latency")
+DB_ERRORS     = Counter("db_query_errors_total", "PostgreSQL queries that raised")
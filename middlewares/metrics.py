@@ -0,0 +1,50 @@
+"""
+Метрики обработчиков: число обновлений и задержка по каждому хендлеру.
+Регистрируется как inner-middleware на observer'ах диспетчера — aiogram
+применяет их и ко всем вложенным роутерам.
+"""
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject
+
+from metrics import HANDLER_TIME, UPDATES
+
+EVENTS = ("message", "callback_query", "inline_query", "chosen_inline_result")
+
+
+def handler_name(handler: HandlerObject | None) -> str:
+    """«quran.handle_quran_query» — модуль роутера и имя функции."""
+    if handler is None:
+        return "unknown"
+    callback = handler.callback
+    module   = getattr(callback, "__module__", "") or ""
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__name__', 'handler')}"
+
+
+class MetricsMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        name  = handler_name(data.get("handler"))
+        start = time.perf_counter()
+        try:
+            result = await handler(event, data)
+        except Exception:
+            UPDATES.inc(handler=name, status="error")
+            raise
+        finally:
+            HANDLER_TIME.observe(time.perf_counter() - start, handler=name)
+        UPDATES.inc(handler=name, status="ok")
+        return result
+
+
+def setup(dp: Dispatcher) -> None:
+    middleware = MetricsMiddleware()
+    for event in EVENTS:
+        dp.observers[event].middleware(middleware)
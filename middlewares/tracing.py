@@ -0,0 +1,61 @@
+"""
+Трассировка обновлений: outer-middleware на dp.update открывает трассу,
+request-middleware сессии бота добавляет span на каждый вызов Bot API
+(span'ы БД и HTTP пишут database/db.py и services/http.py).
+
+Обновления дольше SLOW_UPDATE_MS логируются с разбивкой по span'ам.
+При SLOW_UPDATE_MS=0 и выключенном /profile трасса не создаётся.
+"""
+import logging
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+import tracing
+from config import SLOW_UPDATE_MS
+from services import profiler
+
+logger = logging.getLogger(__name__)
+
+
+class TracingMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        profiling = profiler.should_profile()
+        if not SLOW_UPDATE_MS and not profiling:
+            return await handler(event, data)
+
+        trace, token = tracing.start(f"update {event.update_id} ({event.event_type})")
+        try:
+            if profiling:
+                return await profiler.run(handler, event, data)
+            return await handler(event, data)
+        finally:
+            tracing.finish(token)
+            elapsed_ms = trace.elapsed * 1000
+            if SLOW_UPDATE_MS and elapsed_ms >= SLOW_UPDATE_MS:
+                logger.warning("slow %s: %.0fms — %s", trace.name, elapsed_ms, trace.breakdown())
+
+
+class BotApiTracingMiddleware(BaseRequestMiddleware):
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        with tracing.span("telegram", type(method).__name__):
+            return await make_request(bot, method)
+
+
+def setup(dp: Dispatcher, bot: Bot) -> None:
+    dp.update.outer_middleware(TracingMiddleware())
+    bot.session.middleware(BotApiTracingMiddleware())
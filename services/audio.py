@@ -0,0 +1,154 @@
+"""
+Получение аудио сур и аятов: скачивание из источника, загрузка в storage-канал
+и сохранение в audio_cache. Используется обработчиками и фоновым прогревом.
+"""
+import asyncio
+from collections import Counter
+
+import aiohttp
+
+from database.db import get_db
+from database.models import Reciter, get_cached, save_to_cache
+from locales import t
+from services import cluster
+from services.http import get_session
+from services.quran_api import get_surah, get_ayah
+from services.uploader import stream_audio
+
+
+# ─── single-flight ──────────────────────────────────────────────────────────
+# Если несколько пользователей одновременно просят один и тот же некэшированный
+# файл, скачивание и загрузку выполняет только первый запрос — остальные ждут
+# ту же задачу и получают готовый file_id. Между процессами то же самое
+# обеспечивает аренда в cluster.run_once.
+
+_inflight: dict[tuple[str, int, int | None], asyncio.Task] = {}
+_waiters: Counter[asyncio.Task] = Counter()  # сколько запросов ждут загрузку
+
+
+class UploadError(Exception):
+    """Ошибка загрузки в storage-канал (в отличие от ошибки скачивания)."""
+
+
+def is_loading(key: tuple[str, int, int | None]) -> bool:
+    return key in _inflight
+
+
+def _forget(key: tuple[str, int, int | None], task: asyncio.Task) -> None:
+    # Отменённую загрузку могла уже сменить новая с тем же ключом
+    if _inflight.get(key) is task:
+        del _inflight[key]
+
+
+async def single_flight(key: tuple[str, int, int | None], loader, cancellable: bool = False) -> dict:
+    """cancellable — отмена этого ожидающего отменяет и саму загрузку, если
+    больше её никто не ждёт (упреждающая загрузка, которую вытеснили)."""
+    task = _inflight.get(key)
+    if task is None:
+        reciter_id, surah_n, ayah_n = key
+
+        async def lookup() -> dict | None:
+            return await get_cached(await get_db(), reciter_id, surah_n, ayah_n)
+
+        lease_key = f"{reciter_id}:{surah_n}:{ayah_n or 0}"
+        task = asyncio.create_task(cluster.run_once(lease_key, loader, lookup))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _forget(key, t))
+    # shield — отмена одного ожидающего не должна отменять общую загрузку
+    _waiters[task] += 1
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        if cancellable and _waiters[task] == 1 and not task.done():
+            _forget(key, task)  # новый запрос начнёт загрузку заново, а не получит отмену
+            task.cancel()
+        raise
+    finally:
+        _waiters[task] -= 1
+        if not _waiters[task]:
+            del _waiters[task]
+
+
+async def load_surah(reciter: Reciter, surah_n: int, cancellable: bool = False) -> dict:
+    """Загружает суру (одна загрузка на ключ). Возвращает запись кэша."""
+    return await single_flight(
+        (reciter.identifier, surah_n, None),
+        lambda: _load_surah(reciter, surah_n),
+        cancellable,
+    )
+
+
+async def load_ayah(reciter: Reciter, surah_n: int, ayah_n: int, cancellable: bool = False) -> dict:
+    """Загружает аят (одна загрузка на ключ). Возвращает запись кэша."""
+    return await single_flight(
+        (reciter.identifier, surah_n, ayah_n),
+        lambda: _load_ayah(reciter, surah_n, ayah_n),
+        cancellable,
+    )
+
+
+# ─── loaders ────────────────────────────────────────────────────────────────
+
+async def _upload(url: str, filename: str, title: str, performer: str) -> str:
+    """Скачивание + загрузка в storage-канал. Сетевые ошибки источника
+    пробрасываются как есть, всё остальное — как UploadError."""
+    try:
+        return await stream_audio(url, filename, title=title, performer=performer)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        raise
+    except Exception as e:
+        raise UploadError(e) from e
+
+
+async def _load_surah(reciter: Reciter, surah_n: int) -> dict:
+    """Скачивает суру, загружает в storage-канал и сохраняет в кэш."""
+    info = await get_surah(await get_session(), surah_n, reciter.identifier)
+
+    title     = f"Sura {info.surah_number} - {info.name_arabic} ({info.name})"
+    performer = reciter.display_name
+    filename  = f"Sura {info.surah_number} - {info.name} - {performer}.mp3"
+
+    caption_ru = t("ru", "surah_caption",
+        number=info.surah_number, arabic=info.name_arabic,
+        name=info.name, reciter=performer,
+        translation=info.name_translation, total=info.total_ayah)
+    caption_uz = t("uz", "surah_caption",
+        number=info.surah_number, arabic=info.name_arabic,
+        name=info.name, reciter=performer,
+        translation=info.name_translation, total=info.total_ayah)
+
+    file_id = await _upload(info.audio_url, filename, title, performer)
+
+    db = await get_db()
+    await save_to_cache(db, reciter.identifier, surah_n, None,
+                        file_id, caption_ru, caption_uz, title, performer)
+    return {
+        "file_id": file_id, "caption_ru": caption_ru, "caption_uz": caption_uz,
+        "title": title, "performer": performer,
+    }
+
+
+async def _load_ayah(reciter: Reciter, surah_n: int, ayah_n: int) -> dict:
+    """Скачивает аят, загружает в storage-канал и сохраняет в кэш."""
+    ayah = await get_ayah(await get_session(), surah_n, ayah_n, reciter.identifier)
+
+    title     = f"{ayah.surah_name} {surah_n}:{ayah_n}"
+    performer = reciter.display_name
+    filename  = f"{ayah.surah_name} {surah_n}-{ayah_n} - {performer}.mp3"
+
+    caption_ru = t("ru", "ayah_caption",
+        surah_name=ayah.surah_name, surah=surah_n, ayah=ayah_n,
+        reciter=performer, translation=ayah.russian_text)
+    caption_uz = t("uz", "ayah_caption",
+        surah_name=ayah.surah_name, surah=surah_n, ayah=ayah_n,
+        reciter=performer, translation=ayah.uzbek_text)
+
+    file_id = await _upload(ayah.audio_url, filename, title, performer)
+
+    db = await get_db()
+    await save_to_cache(db, reciter.identifier, surah_n, ayah_n,
+                        file_id, caption_ru, caption_uz, title, performer)
+    return {
+        "file_id": file_id, "caption_ru": caption_ru, "caption_uz": caption_uz,
+        "title": title, "performer": performer,
+    }
@@ -0,0 +1,54 @@
+"""
+Буфер пользователей, заблокировавших бота.
+Вместо UPDATE на каждого — копим id и пишем одним запросом
+по достижении BLOCKED_FLUSH_SIZE или раз в BLOCKED_FLUSH_INTERVAL секунд.
+"""
+import asyncio
+import logging
+
+from config import BLOCKED_FLUSH_SIZE, BLOCKED_FLUSH_INTERVAL
+from database.db import get_db
+from database.models import mark_users_blocked
+
+logger = logging.getLogger(__name__)
+
+_buffer: set[int] = set()
+_task: asyncio.Task | None = None
+
+
+async def add(user_id: int) -> None:
+    _buffer.add(user_id)
+    if len(_buffer) >= BLOCKED_FLUSH_SIZE:
+        await flush()
+
+
+async def flush() -> None:
+    if not _buffer:
+        return
+    user_ids = list(_buffer)
+    _buffer.clear()
+    try:
+        await mark_users_blocked(await get_db(), user_ids)
+    except Exception:
+        logger.exception("blocked: flush of %d ids failed", len(user_ids))
+        _buffer.update(user_ids)  # попробуем в следующий раз
+
+
+async def _flusher() -> None:
+    while True:
+        await asyncio.sleep(BLOCKED_FLUSH_INTERVAL)
+        await flush()
+
+
+def start() -> None:
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_flusher())
+
+
+async def stop() -> None:
+    global _task
+    if _task:
+        _task.cancel()
+        _task = None
+    await flush()
@@ -0,0 +1,255 @@
+"""
+Рассылка сообщения всем пользователям.
+Пул воркеров ограничен token bucket'ом; при TelegramRetryAfter все воркеры
+ставятся на паузу, а скорость снижается и затем плавно восстанавливается.
+Работает фоновой задачей, прогресс периодически пишется в статус-сообщение.
+Получатели читаются из БД страницами по user_id, курсор сохраняется в
+broadcasts — прерванная рассылка продолжается после перезапуска.
+При нескольких воркерах рассылку выполняет лидер: команда админа только
+пишет состояние в БД и передаёт её через cluster.publish.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.types import Message
+
+from config import BROADCAST_RATE, BROADCAST_WORKERS
+from database.db import get_db
+from database.models import (
+    iter_active_user_ids, count_active_users, create_broadcast,
+    save_broadcast_progress, get_unfinished_broadcast, finish_broadcasts,
+)
+from services import blocked, cluster
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 5   # сек между обновлениями статуса
+MIN_RATE          = 1.0
+
+
+class TokenBucket:
+    """Ограничитель скорости: не больше rate операций в секунду (с всплеском до burst)."""
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        self.rate    = rate
+        self.burst   = burst or rate
+        self._tokens = self.burst
+        self._last   = time.monotonic()
+        self._lock   = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Broadcast:
+    def __init__(self, bot: Bot, state: dict) -> None:
+        """state — строка таблицы broadcasts (новая или незавершённая)."""
+        self.bot   = bot
+        self.id    = state["id"]
+        self.text  = state["text"]
+        self.src   = (state["src_chat_id"], state["src_message_id"]) if state["src_message_id"] else None
+        self.status_chat_id    = state["status_chat_id"]
+        self.status_message_id = state["status_message_id"]
+
+        self.total   = state["total"]
+        self.ok      = state["sent"]
+        self.blocked = state["blocked"]
+        self.failed  = state["failed"]
+
+        self.max_rate     = BROADCAST_RATE
+        self.bucket       = TokenBucket(BROADCAST_RATE)
+        self._pause_until = 0.0
+        self._queue: asyncio.Queue[int] = asyncio.Queue(maxsize=BROADCAST_WORKERS * 4)
+
+        # Курсор: все user_id <= cursor уже обработаны. Воркеры завершают
+        # отправки не по порядку, поэтому двигаем его по очереди выданных id.
+        self.cursor = state["last_user_id"]
+        self._issued: deque[int] = deque()
+        self._finished: set[int] = set()
+
+    @property
+    def processed(self) -> int:
+        return self.ok + self.blocked + self.failed
+
+    async def _send(self, user_id: int) -> None:
+        if self.src:
+            await self.bot.copy_message(user_id, from_chat_id=self.src[0], message_id=self.src[1])
+        else:
+            await self.bot.send_message(user_id, self.text, parse_mode="HTML")
+
+    async def _wait_pause(self) -> None:
+        delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _on_retry_after(self, seconds: int) -> None:
+        # Общая пауза для всех воркеров + мультипликативное снижение скорости
+        self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+        self.bucket.rate  = max(MIN_RATE, self.bucket.rate / 2)
+        logger.warning("broadcast: RetryAfter %ss, rate → %.1f/s", seconds, self.bucket.rate)
+
+    def _on_success(self) -> None:
+        # Аддитивное восстановление скорости после снижения
+        if self.bucket.rate < self.max_rate:
+            self.bucket.rate = min(self.max_rate, self.bucket.rate + 0.05)
+
+    def _mark_finished(self, user_id: int) -> None:
+        self._finished.add(user_id)
+        while self._issued and self._issued[0] in self._finished:
+            self.cursor = self._issued.popleft()
+            self._finished.discard(self.cursor)
+
+    async def _worker(self) -> None:
+        while True:
+            user_id = await self._queue.get()
+            try:
+                while True:
+                    await self._wait_pause()
+                    await self.bucket.acquire()
+                    try:
+                        await self._send(user_id)
+                    except TelegramRetryAfter as e:
+                        self._on_retry_after(e.retry_after)
+                        continue
+                    self.ok += 1
+                    self._on_success()
+                    break
+            except TelegramForbiddenError:
+                await blocked.add(user_id)
+                self.blocked += 1
+            except Exception:
+                self.failed += 1
+            # При отмене (CancelledError) сюда не доходим: пользователь без исхода
+            # не должен сдвигать курсор — после resume ему отправим снова
+            self._mark_finished(user_id)
+            self._queue.task_done()
+
+    async def _producer(self) -> None:
+        db = await get_db()
+        async for user_id in iter_active_user_ids(db, after=self.cursor):
+            self._issued.append(user_id)
+            await self._queue.put(user_id)
+
+    async def _save(self, done: bool = False) -> None:
+        await save_broadcast_progress(
+            await get_db(), self.id, self.cursor,
+            self.ok, self.blocked, self.failed, done=done,
+        )
+
+    def _progress_text(self, title: str) -> str:
+        return (
+            f"{title}\n\n"
+            f"📨 Отправлено: <b>{self.ok}</b>\n"
+            f"🔴 Заблокировали: <b>{self.blocked}</b>\n"
+            f"⚠️ Ошибки: <b>{self.failed}</b>\n"
+            f"👥 Всего: <b>{self.processed}</b> из ~{self.total}"
+        )
+
+    async def _edit_status(self, title: str) -> None:
+        try:
+            await self.bot.edit_message_text(
+                self._progress_text(title),
+                chat_id=self.status_chat_id,
+                message_id=self.status_message_id,
+                parse_mode="HTML",
+            )
+        except Exception:
+            pass  # "message is not modified" и т.п. — не критично
+
+    async def _reporter(self) -> None:
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            await self._save()
+            await self._edit_status(f"📤 Рассылка идёт · {self.bucket.rate:.0f} сообщ./сек")
+
+    async def run(self) -> None:
+        workers  = [asyncio.create_task(self._worker()) for _ in range(BROADCAST_WORKERS)]
+        reporter = asyncio.create_task(self._reporter())
+        try:
+            await self._producer()
+            await self._queue.join()
+        except asyncio.CancelledError:
+            # Курсор сохраняем: при перезапуске бота рассылка продолжится
+            await self._shutdown(workers, reporter, "⏹ Рассылка остановлена")
+            raise
+        except Exception:
+            logger.exception("broadcast %s crashed", self.id)
+            await self._shutdown(workers, reporter, "⚠️ Рассылка прервана ошибкой")
+            return
+        await self._shutdown(workers, reporter, "✅ Рассылка завершена", done=True)
+
+    async def _shutdown(self, workers: list[asyncio.Task], reporter: asyncio.Task,
+                        title: str, done: bool = False) -> None:
+        for task in (*workers, reporter):
+            task.cancel()
+        await asyncio.gather(*workers, reporter, return_exceptions=True)
+        await blocked.flush()
+        await self._save(done=done)
+        await self._edit_status(title)
+
+
+_task: asyncio.Task | None = None
+
+
+def is_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+async def is_active() -> bool:
+    """Есть незавершённая рассылка (на любом воркере)."""
+    return await get_unfinished_broadcast(await get_db()) is not None
+
+
+async def start(status: Message, text: str | None = None, src: Message | None = None) -> None:
+    """Создаёт запись рассылки; запускает её лидер (см. restart)."""
+    db = await get_db()
+    await finish_broadcasts(db)  # новая рассылка заменяет прерванную
+    await create_broadcast(
+        db, text,
+        src.chat.id if src else None, src.message_id if src else None,
+        status.chat.id, status.message_id, await count_active_users(db),
+    )
+    await cluster.publish("broadcast")
+
+
+async def resume(bot: Bot) -> None:
+    """Продолжает незавершённую рассылку с сохранённого курсора."""
+    global _task
+    if is_running():
+        return
+    state = await get_unfinished_broadcast(await get_db())
+    if state:
+        logger.info("broadcast %s: resuming after user_id %s", state["id"], state["last_user_id"])
+        _task = asyncio.create_task(Broadcast(bot, state).run())
+
+
+async def restart(bot: Bot) -> None:
+    """Команда лидеру: прервать текущую рассылку и взять новую из БД."""
+    await cancel()
+    await resume(bot)
+
+
+async def cancel() -> None:
+    """Прерывает рассылку в этом процессе — курсор сохраняется для resume()."""
+    if is_running():
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+
+
+async def stop() -> bool:
+    """Останавливает рассылку окончательно (без продолжения после рестарта)."""
+    stopped = await finish_broadcasts(await get_db()) > 0
+    await cluster.publish("broadcast_stop")
+    return stopped
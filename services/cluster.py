@@ -0,0 +1,230 @@
+"""
+Координация нескольких процессов бота на одной БД (MULTI_WORKER=1).
+
+- Аренда загрузки: ключ (reciter, surah, ayah) скачивает и загружает только
+  воркер, взявший строку в audio_leases; остальные ждут NOTIFY audio_ready
+  и читают готовый file_id из audio_cache.
+- NOTIFY user_changed сбрасывает user_cache на всех воркерах,
+  NOTIFY reciters_changed (триггер на reciters) — список чтецов в памяти.
+- Лидер (session advisory lock на слушающем соединении) выполняет фоновые
+  задачи: прогрев, рассылку, снимок статистики. Если лидер падает, lock
+  освобождается вместе с его соединением и лидером становится другой воркер.
+- Канал control: команды админа, принятые любым воркером, исполняет лидер.
+
+Без MULTI_WORKER процесс сразу считается лидером, аренда и команды выполняются
+локально; слушающее соединение нужно только для сброса кэшей.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import socket
+from typing import Any, Awaitable, Callable
+
+import asyncpg
+
+from config import DATABASE_URL, MULTI_WORKER, LEASE_TTL
+from database.db import get_db
+from database.models import (
+    USER_CHANGED, RECITERS_CHANGED, user_cache, invalidate_reciters,
+    acquire_lease, renew_lease, release_lease,
+)
+
+logger = logging.getLogger(__name__)
+
+AUDIO_READY   = "audio_ready"
+CONTROL       = "control"
+LEADER_LOCK   = 7_751_110_002   # id advisory lock'а лидера
+TICK_INTERVAL = 5               # сек между попытками стать лидером / проверками соединения
+
+WORKER_NAME = f"{socket.gethostname()}:{os.getpid()}"
+
+_leader = False
+_task: asyncio.Task | None = None
+_waiters: dict[str, set[asyncio.Future]] = {}
+_commands: dict[str, Callable[[], Any]] = {}
+_on_elected: Callable[[], Awaitable[None]] | None = None
+_on_demoted: Callable[[], Awaitable[None]] | None = None
+
+
+def is_leader() -> bool:
+    return _leader
+
+
+def on_command(name: str, handler: Callable[[], Any]) -> None:
+    """Регистрирует обработчик команды control (выполняется только на лидере)."""
+    _commands[name] = handler
+
+
+async def publish(command: str) -> None:
+    """Отправляет команду лидеру (в однопроцессном режиме — выполняет сразу)."""
+    if not MULTI_WORKER:
+        await _run_command(command)
+        return
+    await (await get_db()).execute("SELECT pg_notify($1, $2)", CONTROL, command)
+
+
+async def _run_command(command: str) -> None:
+    handler = _commands.get(command)
+    if handler is None or not _leader:
+        return
+    try:
+        result = handler()
+        if inspect.isawaitable(result):
+            await result
+    except Exception:
+        logger.exception("cluster: command %s failed", command)
+
+
+# ─── аренда загрузок ────────────────────────────────────────────────────────
+
+def _watch(key: str) -> asyncio.Future:
+    fut = asyncio.get_running_loop().create_future()
+    _waiters.setdefault(key, set()).add(fut)
+    return fut
+
+
+def _unwatch(key: str, fut: asyncio.Future) -> None:
+    waiters = _waiters.get(key)
+    if waiters:
+        waiters.discard(fut)
+        if not waiters:
+            del _waiters[key]
+
+
+def _wake(key: str | None = None) -> None:
+    groups = _waiters.values() if key is None else [_waiters.get(key, ())]
+    for waiters in groups:
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+
+
+async def _renew_loop(db: asyncpg.Pool, key: str) -> None:
+    while True:
+        await asyncio.sleep(LEASE_TTL / 3)
+        try:
+            await renew_lease(db, key, WORKER_NAME, LEASE_TTL)
+        except Exception:
+            logger.warning("cluster: failed to renew lease %s", key)
+
+
+async def run_once(
+    key: str,
+    loader: Callable[[], Awaitable[dict]],
+    lookup: Callable[[], Awaitable[dict | None]],
+) -> dict:
+    """
+    Выполняет loader только на одном воркере кластера.
+    Остальные ждут NOTIFY и возвращают результат lookup(). Если владелец
+    аренды не справился (ошибка или падение), аренду берёт следующий.
+    """
+    if not MULTI_WORKER:
+        return await loader()
+
+    db = await get_db()
+    while True:
+        # Подписываемся до попытки аренды, чтобы не пропустить NOTIFY
+        ready = _watch(key)
+        try:
+            if await acquire_lease(db, key, WORKER_NAME, LEASE_TTL):
+                renew = asyncio.create_task(_renew_loop(db, key))
+                try:
+                    return await loader()
+                finally:
+                    renew.cancel()
+                    await release_lease(db, key, WORKER_NAME, AUDIO_READY)
+
+            found = await lookup()
+            if found is not None:
+                return found
+            # По таймауту аренда могла истечь (владелец упал) — пробуем снова
+            await asyncio.wait({ready}, timeout=LEASE_TTL)
+        finally:
+            _unwatch(key, ready)
+
+
+# ─── слушающее соединение и лидерство ───────────────────────────────────────
+
+def _on_audio_ready(conn, pid, channel, payload: str) -> None:
+    _wake(payload)
+
+
+def _on_user_changed(conn, pid, channel, payload: str) -> None:
+    user_cache.pop(int(payload))
+
+
+def _on_reciters_changed(conn, pid, channel, payload: str) -> None:
+    invalidate_reciters()
+
+
+def _on_control(conn, pid, channel, payload: str) -> None:
+    asyncio.create_task(_run_command(payload))
+
+
+async def _set_leader(value: bool) -> None:
+    global _leader
+    if _leader == value:
+        return
+    _leader = value
+    logger.info("cluster: %s %s", WORKER_NAME, "is the leader" if value else "is no longer the leader")
+    callback = _on_elected if value else _on_demoted
+    if callback:
+        try:
+            await callback()
+        except Exception:
+            logger.exception("cluster: leadership callback failed")
+
+
+async def _listen() -> None:
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(DATABASE_URL)
+            await conn.add_listener(AUDIO_READY, _on_audio_ready)
+            await conn.add_listener(USER_CHANGED, _on_user_changed)
+            await conn.add_listener(RECITERS_CHANGED, _on_reciters_changed)
+            await conn.add_listener(CONTROL, _on_control)
+            # Пока соединения не было, NOTIFY могли потеряться — сбрасываем
+            # список чтецов, ждущие аренды перепроверят кэш
+            invalidate_reciters()
+            _wake()
+            while True:
+                if _leader or not MULTI_WORKER:
+                    await conn.execute("SELECT 1")  # соединение живо (и lock лидера за нами)
+                elif await conn.fetchval("SELECT pg_try_advisory_lock($1)", LEADER_LOCK):
+                    await _set_leader(True)
+                await asyncio.sleep(TICK_INTERVAL)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("cluster: listener connection lost")
+        finally:
+            if conn is not None and not conn.is_closed():
+                conn.terminate()
+        # lock лидера освобождён вместе с соединением
+        if MULTI_WORKER:
+            await _set_leader(False)
+        await asyncio.sleep(TICK_INTERVAL)
+
+
+async def start(
+    on_elected: Callable[[], Awaitable[None]],
+    on_demoted: Callable[[], Awaitable[None]],
+) -> None:
+    """on_elected / on_demoted запускают и останавливают фоновые задачи лидера."""
+    global _task, _on_elected, _on_demoted
+    _on_elected, _on_demoted = on_elected, on_demoted
+    if not MULTI_WORKER:
+        await _set_leader(True)
+    if _task is None:
+        _task = asyncio.create_task(_listen())
+
+
+async def stop() -> None:
+    global _task
+    if _task:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+    await _set_leader(False)
@@ -0,0 +1,51 @@
+"""
+Общая aiohttp-сессия на всё приложение.
+Одно пуловое соединение на хост вместо нового TCP+TLS рукопожатия на каждый запрос.
+"""
+import time
+
+import aiohttp
+
+import tracing
+from config import HTTP_POOL_LIMIT, HTTP_POOL_PER_HOST
+
+_session: aiohttp.ClientSession | None = None
+
+
+async def _on_request_start(session, ctx, params) -> None:
+    ctx.started = time.perf_counter()
+
+
+async def _on_request_end(session, ctx, params) -> None:
+    # Время до заголовков ответа; тело (аудио) читается уже вне этого span'а
+    if tracing.current() is not None:  # подпись span'а строим только под трассой
+        tracing.record("http", f"{params.method} {params.url.host}{params.url.path}",
+                       time.perf_counter() - ctx.started)
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(_on_request_start)
+    config.on_request_end.append(_on_request_end)
+    config.on_request_exception.append(_on_request_end)
+    return config
+
+
+async def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_PER_HOST,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        _session = aiohttp.ClientSession(connector=connector, trace_configs=[_trace_config()])
+    return _session
+
+
+async def close_session() -> None:
+    global _session
+    if _session and not _session.closed:
+        await _session.close()
+    _session = None
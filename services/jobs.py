@@ -0,0 +1,160 @@
+"""
+Очередь загрузок по промахам кэша.
+Ограниченное число воркеров (DOWNLOAD_WORKERS) и глубина очереди (JOB_MAX_DEPTH);
+задачи разных пользователей выбираются по кругу, чтобы один пользователь
+с десятком запросов не задерживал остальных. Одинаковые ключи объединяются.
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+import tracing
+from config import DOWNLOAD_WORKERS, JOB_MAX_DEPTH
+from metrics import Gauge
+
+
+class QueueFull(Exception):
+    """Очередь заполнена — новый запрос не принят."""
+
+
+@dataclass
+class _Job:
+    key: Hashable
+    owner: int
+    loader: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+_queues: OrderedDict[int, deque[_Job]] = OrderedDict()  # owner -> его задачи
+_jobs: dict[Hashable, _Job] = {}                         # в очереди и в работе
+_waits: deque[float] = deque(maxlen=200)                 # время ожидания в очереди
+_running = 0
+_has_work: asyncio.Event | None = None
+_workers: list[asyncio.Task] = []
+
+
+def depth() -> int:
+    return sum(len(q) for q in _queues.values())
+
+
+def stats() -> dict:
+    return {
+        "queued":   depth(),
+        "running":  _running,
+        "users":    len(_queues),
+        "avg_wait": sum(_waits) / len(_waits) if _waits else 0.0,
+        "max_wait": max(_waits, default=0.0),
+    }
+
+
+Gauge("download_jobs", "Download queue by state", lambda: {
+    (("state", "queued"),):  depth(),
+    (("state", "running"),): _running,
+})
+
+
+def _position(job: _Job) -> int:
+    """Сколько задач будет взято воркерами раньше этой (0 — стартует сразу)."""
+    q = _queues.get(job.owner)
+    if not q or job not in q:
+        return 0
+    i      = q.index(job)
+    owners = list(_queues)
+    k      = owners.index(job.owner)
+    # Круговой порядок: в раунде r берётся r-я задача каждого владельца
+    ahead = i + sum(
+        min(len(_queues[o]), i + 1 if idx < k else i)
+        for idx, o in enumerate(owners) if idx != k
+    )
+    return max(0, ahead + 1 - (DOWNLOAD_WORKERS - _running))
+
+
+def _next_job() -> _Job:
+    owner, q = next(iter(_queues.items()))
+    job = q.popleft()
+    if q:
+        _queues.move_to_end(owner)
+    else:
+        del _queues[owner]
+    return job
+
+
+async def _worker() -> None:
+    global _running
+    while True:
+        if not _queues:
+            _has_work.clear()
+            await _has_work.wait()
+            continue
+
+        job = _next_job()
+        _running += 1
+        _waits.append(time.monotonic() - job.enqueued_at)
+        try:
+            job.future.set_result(await job.loader())
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as e:
+            job.future.set_exception(e)
+            job.future.exception()  # помечаем как полученное — ждущих может не быть
+        finally:
+            _running -= 1
+            _jobs.pop(job.key, None)
+
+
+def start() -> None:
+    global _has_work
+    if _workers:
+        return
+    _has_work = asyncio.Event()
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(DOWNLOAD_WORKERS))
+
+
+def stop() -> None:
+    """Останавливает воркеры; ждущие задач из очереди получают отмену, а не висят."""
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
+    for q in _queues.values():
+        for job in q:
+            job.future.cancel()
+            _jobs.pop(job.key, None)
+    _queues.clear()
+
+
+async def submit(
+    owner: int,
+    key: Hashable,
+    loader: Callable[[], Awaitable[Any]],
+    on_queued: Callable[[int], Awaitable[Any]] | None = None,
+) -> Any:
+    """
+    Ставит loader в очередь и ждёт результат.
+    Если задача не стартует сразу — вызывает on_queued(позиция).
+    Бросает QueueFull, если очередь заполнена.
+    """
+    start()
+    job = _jobs.get(key)
+    if job is None:
+        if depth() >= JOB_MAX_DEPTH:
+            raise QueueFull()
+        job = _Job(key=key, owner=owner, loader=loader,
+                   future=asyncio.get_running_loop().create_future())
+        _jobs[key] = job
+        _queues.setdefault(owner, deque()).append(job)
+        _has_work.set()
+
+    position = _position(job)
+    if position and on_queued:
+        try:
+            await on_queued(position)
+        except Exception:
+            pass  # уведомление о позиции не должно срывать загрузку
+    # shield — уход одного ожидающего не отменяет общую задачу.
+    # Загрузка идёт в контексте воркера — в трассе обновления видно только ожидание.
+    with tracing.span("job", str(key)):
+        return await asyncio.shield(job.future)
@@ -6,7 +6,8 @@ from urllib.parse import parse_qsl
 
 from aiohttp import web
 
-from config import BOT_TOKEN
+import metrics
+from config import BOT_TOKEN, METRICS_TOKEN
 from database.db import get_db
 from database.models import get_user_language, set_user_language
 
@@ -66,9 +67,16 @@ async def handle_register(request: web.Request) -> web.Response:
     return web.json_response({"ok": True, "lang": lang, "is_new": is_new})
 
 
+async def handle_metrics(request: web.Request) -> web.Response:
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return web.Response(status=401)
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+
 def make_app() -> web.Application:
     app = web.Application()
     app.router.add_post("/api/register", handle_register)
+    app.router.add_get("/metrics", handle_metrics)
 
     async def _cors(request, handler):
         response = await handler(request)
@@ -0,0 +1,78 @@
+"""
+Упреждающая загрузка: после выдачи аята или суры в фоне готовим следующие,
+чтобы кнопка «▶️» при последовательном прослушивании срабатывала мгновенно.
+Низкий приоритет — общий лимит параллельности, при переполнении очереди
+самые старые задачи отменяются вместе с их загрузкой (если её не ждёт
+пользователь), а пока в очереди jobs есть промахи пользователей — не планируем.
+"""
+import asyncio
+import logging
+
+from config import PREFETCH_AYAHS, PREFETCH_SURAHS, PREFETCH_CONCURRENCY, PREFETCH_MAX_PENDING
+from database.db import get_db
+from database.models import Reciter, get_cached
+from services import jobs
+from services.audio import load_surah, load_ayah, is_loading
+from services.quran_meta import MAX_SURAH, next_ayah
+
+logger = logging.getLogger(__name__)
+
+_sem = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+_pending: dict[tuple[str, int, int | None], asyncio.Task] = {}
+
+
+def _next_items(surah_n: int, ayah_n: int | None) -> list[tuple[int, int | None]]:
+    items = []
+    if ayah_n is None:
+        for s in range(surah_n + 1, min(surah_n + PREFETCH_SURAHS, MAX_SURAH) + 1):
+            items.append((s, None))
+        return items
+
+    pos = (surah_n, ayah_n)
+    for _ in range(PREFETCH_AYAHS):
+        pos = next_ayah(*pos)
+        if pos is None:
+            break
+        items.append(pos)
+    return items
+
+
+async def _prefetch(reciter: Reciter, surah_n: int, ayah_n: int | None) -> None:
+    async with _sem:
+        db = await get_db()
+        if await get_cached(db, reciter.identifier, surah_n, ayah_n):
+            return
+        try:
+            if ayah_n is None:
+                await load_surah(reciter, surah_n, cancellable=True)
+            else:
+                await load_ayah(reciter, surah_n, ayah_n, cancellable=True)
+        except Exception as e:
+            logger.debug("prefetch %s %s:%s failed: %s", reciter.identifier, surah_n, ayah_n, e)
+
+
+def _forget(key: tuple[str, int, int | None], task: asyncio.Task) -> None:
+    if _pending.get(key) is task:
+        del _pending[key]
+
+
+def schedule(reciter: Reciter, surah_n: int, ayah_n: int | None = None) -> None:
+    """Ставит в фон загрузку позиций, следующих за (surah_n, ayah_n)."""
+    if PREFETCH_MAX_PENDING <= 0:
+        return
+    # Слоты загрузки нужнее пользователям, ждущим в очереди промахов
+    if jobs.depth() > 0:
+        return
+
+    for s, a in _next_items(surah_n, ayah_n):
+        key = (reciter.identifier, s, a)
+        if key in _pending or is_loading(key):
+            continue
+
+        # Очередь забита — отменяем самую старую задачу, новая важнее
+        while len(_pending) >= PREFETCH_MAX_PENDING:
+            _pending.pop(next(iter(_pending))).cancel()
+
+        task = asyncio.create_task(_prefetch(reciter, s, a))
+        _pending[key] = task
+        task.add_done_callback(lambda t, key=key: _forget(key, t))
@@ -0,0 +1,180 @@
+"""
+Фоновый прогрев audio_cache: заранее скачивает и загружает в storage-канал
+всё, чего ещё нет в кэше, чтобы первый запрос пользователя не ждал загрузки.
+Курсор прогресса хранится в prewarm_jobs — после перезапуска работа продолжается.
+При нескольких воркерах прогрев выполняет лидер (команды через cluster.publish).
+"""
+import asyncio
+import logging
+
+from aiogram import Bot
+from pyrogram.errors import FloodWait
+
+from config import ADMIN_ID, PREWARM_CONCURRENCY
+from database.db import get_db
+from database.models import (
+    Reciter, get_all_reciters, get_cached_keys,
+    get_pending_prewarm_jobs, save_prewarm_job, cancel_prewarm_jobs,
+)
+from services import cluster
+from services.audio import load_surah, load_ayah, UploadError
+from services.quran_meta import MAX_SURAH, ayah_count
+
+logger = logging.getLogger(__name__)
+
+MODES       = ("surahs", "ayahs")
+MAX_RETRIES = 3
+
+_task: asyncio.Task | None = None
+_progress: dict = {}
+
+
+def is_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def status() -> dict:
+    return dict(_progress)
+
+
+async def pending_jobs() -> int:
+    """Незавершённые задачи в БД (прогрев может идти на другом воркере)."""
+    return len(await get_pending_prewarm_jobs(await get_db()))
+
+
+def _items(mode: str, after: tuple[int, int]) -> list[tuple[int, int | None]]:
+    """Все позиции режима строго после курсора (surah, ayah)."""
+    if mode == "surahs":
+        return [(s, None) for s in range(after[0] + 1, MAX_SURAH + 1)]
+    return [
+        (s, a)
+        for s in range(after[0], MAX_SURAH + 1)
+        for a in range(1, ayah_count(s) + 1)
+        if (s, a) > after
+    ]
+
+
+async def _load_one(reciter: Reciter, surah_n: int, ayah_n: int | None) -> bool:
+    failures = 0
+    while failures < MAX_RETRIES:
+        try:
+            if ayah_n is None:
+                await load_surah(reciter, surah_n)
+            else:
+                await load_ayah(reciter, surah_n, ayah_n)
+            return True
+        except UploadError as e:
+            if isinstance(e.__cause__, FloodWait):
+                # FloodWait не считается ошибкой — ждём сколько просит Telegram
+                logger.warning("prewarm: FloodWait %ss", e.__cause__.value)
+                await asyncio.sleep(e.__cause__.value + 1)
+                continue
+            logger.warning("prewarm: upload %s %s:%s failed: %s",
+                           reciter.identifier, surah_n, ayah_n, e.__cause__)
+        except Exception as e:
+            logger.warning("prewarm: fetch %s %s:%s failed: %s",
+                           reciter.identifier, surah_n, ayah_n, e)
+        failures += 1
+        await asyncio.sleep(2 ** failures)
+    return False
+
+
+async def _run_job(reciter: Reciter, mode: str, cursor: tuple[int, int]) -> None:
+    db     = await get_db()
+    cached = await get_cached_keys(db, reciter.identifier)
+    todo   = [i for i in _items(mode, cursor) if i not in cached]
+
+    _progress.update(reciter=reciter.display_name, mode=mode, total=len(todo), done=0)
+
+    # Пачками по PREWARM_CONCURRENCY: после каждой пачки сохраняем курсор,
+    # так что всё до него гарантированно обработано.
+    for start in range(0, len(todo), PREWARM_CONCURRENCY):
+        batch   = todo[start:start + PREWARM_CONCURRENCY]
+        results = await asyncio.gather(*(_load_one(reciter, s, a) for s, a in batch))
+        _progress["done"]   += sum(results)
+        _progress["failed"] += len(results) - sum(results)
+
+        last_s, last_a = batch[-1]
+        await save_prewarm_job(db, reciter.identifier, mode, last_s, last_a or 0)
+
+    await save_prewarm_job(db, reciter.identifier, mode, MAX_SURAH, 0, done=True)
+
+
+async def _run(bot: Bot, jobs: list[tuple[Reciter, str, tuple[int, int]]]) -> None:
+    _progress.clear()
+    _progress.update(jobs=len(jobs), finished_jobs=0, failed=0)
+    try:
+        for reciter, mode, cursor in jobs:
+            await _run_job(reciter, mode, cursor)
+            _progress["finished_jobs"] += 1
+    except asyncio.CancelledError:
+        logger.info("prewarm: cancelled")
+        raise
+    except Exception:
+        logger.exception("prewarm: crashed")
+        return
+
+    logger.info("prewarm: finished, %d failed", _progress["failed"])
+    try:
+        await bot.send_message(
+            ADMIN_ID,
+            f"🔥 Прогрев кэша завершён\n"
+            f"Задач: <b>{_progress['jobs']}</b> · ошибок: <b>{_progress['failed']}</b>",
+            parse_mode="HTML",
+        )
+    except Exception:
+        pass
+
+
+async def start(reciters: list[Reciter], mode: str) -> None:
+    """Ставит прогрев с начала для указанных чтецов; выполняет его лидер."""
+    db = await get_db()
+    for reciter in reciters:
+        await save_prewarm_job(db, reciter.identifier, mode)
+    await cluster.publish("prewarm")
+
+
+async def resume(bot: Bot) -> None:
+    """Продолжает незавершённые задачи (после перезапуска или по команде)."""
+    global _task
+    if is_running():
+        return
+    db       = await get_db()
+    pending  = await get_pending_prewarm_jobs(db)
+    reciters = {r.identifier: r for r in await get_all_reciters(db)}
+
+    jobs = [
+        (reciters[j["reciter_id"]], j["mode"], (j["surah_number"], j["ayah_number"]))
+        for j in pending
+        if j["reciter_id"] in reciters and j["mode"] in MODES
+    ]
+    if jobs:
+        logger.info("prewarm: resuming %d job(s)", len(jobs))
+        _task = asyncio.create_task(_run(bot, jobs))
+
+
+async def restart(bot: Bot) -> None:
+    """Команда лидеру: перечитать задачи из БД и начать заново."""
+    await cancel()
+    await resume(bot)
+
+
+async def cancel() -> None:
+    """Прерывает прогрев в этом процессе — курсор сохраняется для resume()."""
+    if is_running():
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+
+
+async def halt() -> None:
+    """Команда лидеру: прервать прогрев без продолжения."""
+    await cancel()
+    # Пачка, завершившаяся до отмены, могла снова записать done=FALSE
+    await cancel_prewarm_jobs(await get_db())
+
+
+async def stop() -> bool:
+    """Останавливает прогрев; незавершённые задачи не возобновятся после рестарта."""
+    stopped = await cancel_prewarm_jobs(await get_db()) > 0
+    await cluster.publish("prewarm_stop")
+    return stopped
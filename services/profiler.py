@@ -0,0 +1,88 @@
+"""
+Профилирование по запросу админа (/profile N): следующие N обновлений
+обрабатываются под cProfile, затем админу приходит отчёт pstats.
+Обновления профилируются по одному — пока идёт замер, остальные проходят
+без профилировщика. cProfile видит весь поток, поэтому в отчёт попадает и
+то, что event loop выполнял параллельно с профилируемым обработчиком.
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+
+from aiogram import Bot
+from aiogram.types import BufferedInputFile
+
+logger = logging.getLogger(__name__)
+
+REPORT_LINES = 40
+
+_remaining = 0
+_sampled = 0
+_busy = False
+_chat_id: int | None = None
+_profile: cProfile.Profile | None = None
+
+
+def arm(count: int, chat_id: int) -> bool:
+    """Профилировать следующие count обновлений, отчёт — в chat_id.
+    False — уже идёт замер: новый Profile подменил бы включённый в run()."""
+    global _remaining, _sampled, _chat_id, _profile
+    if _busy or _remaining > 0:
+        return False
+    _remaining, _sampled, _chat_id = count, 0, chat_id
+    _profile = cProfile.Profile()
+    return True
+
+
+def disarm() -> bool:
+    global _remaining
+    active, _remaining = _remaining > 0, 0
+    return active
+
+
+def status() -> tuple[int, int]:
+    """(сколько обновлений уже снято, сколько осталось)."""
+    return _sampled, _remaining
+
+
+def should_profile() -> bool:
+    return _remaining > 0 and not _busy
+
+
+async def run(handler, event, data):
+    global _busy, _remaining, _sampled
+    profile = _profile
+    _busy = True
+    try:
+        profile.enable()
+    except ValueError:
+        # Уже работает другой профилировщик (например, отладчик)
+        _busy = False
+        return await handler(event, data)
+    try:
+        return await handler(event, data)
+    finally:
+        profile.disable()
+        _busy = False
+        _sampled += 1
+        # /profile stop во время замера уже обнулил счётчик — не уходим в минус
+        if _remaining > 0:
+            _remaining -= 1
+            if _remaining == 0:
+                asyncio.create_task(_report(data["bot"], profile, _chat_id, _sampled))
+
+
+async def _report(bot: Bot, profile: cProfile.Profile, chat_id: int, sampled: int) -> None:
+    out = io.StringIO()
+    stats = pstats.Stats(profile, stream=out)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(REPORT_LINES)
+    try:
+        await bot.send_document(
+            chat_id,
+            BufferedInputFile(out.getvalue().encode(), filename="profile.txt"),
+            caption=f"🧪 Профиль {sampled} обновлений (cProfile, по cumulative)",
+        )
+    except Exception:
+        logger.exception("profiler: failed to send report")
@@ -1,11 +1,17 @@
 """
 Аудио: https://quranapi.pages.dev/api/
 Русский перевод: https://api.alquran.cloud/v1 (ru.kuliev — Эльмир Кулиев)
+
+Если загружен локальный индекс (services.quran_index), названия сур и переводы
+берутся из него, а по сети запрашиваются только ссылки на аудио.
 """
 import asyncio
 import aiohttp
 from dataclasses import dataclass
 
+from metrics import QURAN_API, timed
+from services import quran_index
+
 API_BASE      = "https://quranapi.pages.dev/api"
 ALQURAN_BASE  = "https://api.alquran.cloud/v1"
 RU_EDITION    = "ru.kuliev"
@@ -33,8 +39,8 @@ class AyahInfo:
     audio_url: str
 
 
-async def _fetch(session: aiohttp.ClientSession, url: str) -> dict:
-    async with session.get(url, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+async def _fetch(session: aiohttp.ClientSession, url: str, timeout: float = 15) -> dict:
+    async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
         resp.raise_for_status()
         return await resp.json(content_type=None)
 
@@ -47,11 +53,24 @@ async def _get_translation(session: aiohttp.ClientSession, surah: int, ayah: int
         return ""
 
 
+@timed(QURAN_API, call="get_surah")
 async def get_surah(
     session: aiohttp.ClientSession,
     surah_number: int,
     reciter_id: str,
 ) -> SurahInfo:
+    meta = quran_index.get_surah_meta(surah_number)
+    if meta:
+        audio = await _fetch(session, f"{API_BASE}/audio/{surah_number}.json")
+        return SurahInfo(
+            surah_number=surah_number,
+            name=meta.name,
+            name_arabic=meta.name_arabic,
+            name_translation=meta.name_translation,
+            total_ayah=meta.total_ayah,
+            audio_url=audio[reciter_id]["url"],
+        )
+
     data = await _fetch(session, f"{API_BASE}/{surah_number}.json")
     audio = data["audio"][reciter_id]
     return SurahInfo(
@@ -64,13 +83,28 @@ async def get_surah(
     )
 
 
+@timed(QURAN_API, call="get_ayah")
 async def get_ayah(
     session: aiohttp.ClientSession,
     surah_number: int,
     ayah_number: int,
     reciter_id: str,
 ) -> AyahInfo:
-    # Запрашиваем аудио, русский и узбекский переводы параллельно
+    meta = quran_index.get_surah_meta(surah_number)
+    text = quran_index.get_ayah_text(surah_number, ayah_number)
+    if meta and text:
+        audio = await _fetch(session, f"{API_BASE}/audio/{surah_number}/{ayah_number}.json")
+        return AyahInfo(
+            surah_number=surah_number,
+            ayah_number=ayah_number,
+            surah_name=meta.name,
+            arabic_text=text.arabic,
+            russian_text=text.russian,
+            uzbek_text=text.uzbek,
+            audio_url=audio[reciter_id]["url"],
+        )
+
+    # Индекса нет — запрашиваем аудио, русский и узбекский переводы параллельно
     audio_task = _fetch(session, f"{API_BASE}/{surah_number}/{ayah_number}.json")
     ru_task    = _get_translation(session, surah_number, ayah_number, RU_EDITION)
     uz_task    = _get_translation(session, surah_number, ayah_number, UZ_EDITION)
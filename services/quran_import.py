@@ -0,0 +1,76 @@
+"""
+Одноразовый импорт локального индекса Корана в PostgreSQL:
+метаданные и арабский текст — quranapi.pages.dev, переводы — api.alquran.cloud.
+
+Запуск:  python -m services.quran_import
+"""
+import asyncio
+import logging
+
+import aiohttp
+
+from database.db import init_db, get_db, close_db
+from database.models import save_quran_index
+from services.http import get_session, close_session
+from services.quran_api import API_BASE, ALQURAN_BASE, RU_EDITION, UZ_EDITION, _fetch
+
+logger = logging.getLogger(__name__)
+
+TOTAL_SURAHS = 114
+
+
+async def _fetch_edition(session: aiohttp.ClientSession, edition: str) -> dict[tuple[int, int], str]:
+    data = await _fetch(session, f"{ALQURAN_BASE}/quran/{edition}", timeout=120)
+    return {
+        (surah["number"], ayah["numberInSurah"]): ayah["text"]
+        for surah in data["data"]["surahs"]
+        for ayah in surah["ayahs"]
+    }
+
+
+async def import_index() -> None:
+    session = await get_session()
+    sem = asyncio.Semaphore(10)
+
+    async def fetch_surah(n: int) -> dict:
+        async with sem:
+            return await _fetch(session, f"{API_BASE}/{n}.json")
+
+    surah_data, ru, uz = await asyncio.gather(
+        asyncio.gather(*(fetch_surah(n) for n in range(1, TOTAL_SURAHS + 1))),
+        _fetch_edition(session, RU_EDITION),
+        _fetch_edition(session, UZ_EDITION),
+    )
+
+    surahs, ayahs = [], []
+    for n, data in enumerate(surah_data, start=1):
+        surahs.append((
+            n, data["surahName"], data["surahNameArabic"],
+            data["surahNameTranslation"], data["totalAyah"],
+        ))
+        arabic = data.get("arabic2") or data.get("arabic1") or []
+        for a in range(1, data["totalAyah"] + 1):
+            ayahs.append((
+                n, a,
+                arabic[a - 1] if a <= len(arabic) else "",
+                ru.get((n, a), ""),
+                uz.get((n, a), ""),
+            ))
+
+    db = await get_db()
+    await save_quran_index(db, surahs, ayahs)
+    logger.info("Imported %d surahs, %d ayahs", len(surahs), len(ayahs))
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    await init_db()
+    try:
+        await import_index()
+    finally:
+        await close_session()
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Локальный индекс Корана: метаданные сур и тексты переводов.
+Заполняется один раз импортёром (python -m services.quran_import),
+при старте бота загружается из PostgreSQL в память.
+"""
+import logging
+from dataclasses import dataclass
+
+import asyncpg
+
+from database.models import get_surah_index, get_ayah_index
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SurahMeta:
+    number: int
+    name: str
+    name_arabic: str
+    name_translation: str
+    total_ayah: int
+
+
+@dataclass
+class AyahText:
+    arabic: str
+    russian: str
+    uzbek: str
+
+
+_surahs: dict[int, SurahMeta] = {}
+_ayahs: dict[tuple[int, int], AyahText] = {}
+
+
+async def load_index(db: asyncpg.Pool) -> None:
+    global _surahs, _ayahs
+    _surahs = {r["number"]: SurahMeta(**r) for r in await get_surah_index(db)}
+    _ayahs = {
+        (r["surah_number"], r["ayah_number"]): AyahText(
+            arabic=r["text_ar"] or "",
+            russian=r["text_ru"] or "",
+            uzbek=r["text_uz"] or "",
+        )
+        for r in await get_ayah_index(db)
+    }
+    if _surahs:
+        logger.info("Quran index loaded: %d surahs, %d ayahs", len(_surahs), len(_ayahs))
+    else:
+        logger.warning("Quran index is empty — run `python -m services.quran_import`")
+
+
+def all_surahs() -> list[SurahMeta]:
+    return list(_surahs.values())
+
+
+def get_surah_meta(surah_number: int) -> SurahMeta | None:
+    return _surahs.get(surah_number)
+
+
+def get_ayah_text(surah_number: int, ayah_number: int) -> AyahText | None:
+    return _ayahs.get((surah_number, ayah_number))
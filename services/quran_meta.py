@@ -0,0 +1,52 @@
+"""
+Встроенная таблица числа аятов в каждой из 114 сур (по Хафсу, всего 6236).
+Позволяет проверять запросы «сура:аят» и строить навигацию без обращения к сети.
+"""
+
+MAX_SURAH = 114
+
+AYAH_COUNTS: tuple[int, ...] = (
+    7, 286, 200, 176, 120, 165, 206, 75, 129, 109,
+    123, 111, 43, 52, 99, 128, 111, 110, 98, 135,
+    112, 78, 118, 64, 77, 227, 93, 88, 69, 60,
+    34, 30, 73, 54, 45, 83, 182, 88, 75, 85,
+    54, 53, 89, 59, 37, 35, 38, 29, 18, 45,
+    60, 49, 62, 55, 78, 96, 29, 22, 24, 13,
+    14, 11, 11, 18, 12, 12, 30, 52, 52, 44,
+    28, 28, 20, 56, 40, 31, 50, 40, 46, 42,
+    29, 19, 36, 25, 22, 17, 19, 26, 30, 20,
+    15, 21, 11, 8, 8, 19, 5, 8, 8, 11,
+    11, 8, 3, 9, 5, 4, 7, 3, 6, 3,
+    5, 4, 5, 6,
+)
+
+
+def is_valid_surah(surah_n: int) -> bool:
+    return 1 <= surah_n <= MAX_SURAH
+
+
+def ayah_count(surah_n: int) -> int:
+    """Число аятов в суре; 0 для несуществующей суры."""
+    return AYAH_COUNTS[surah_n - 1] if is_valid_surah(surah_n) else 0
+
+
+def is_valid_ayah(surah_n: int, ayah_n: int) -> bool:
+    return 1 <= ayah_n <= ayah_count(surah_n)
+
+
+def next_ayah(surah_n: int, ayah_n: int) -> tuple[int, int] | None:
+    """Следующий аят с переходом на начало следующей суры."""
+    if ayah_n < ayah_count(surah_n):
+        return surah_n, ayah_n + 1
+    if surah_n < MAX_SURAH:
+        return surah_n + 1, 1
+    return None
+
+
+def prev_ayah(surah_n: int, ayah_n: int) -> tuple[int, int] | None:
+    """Предыдущий аят с переходом на конец предыдущей суры."""
+    if ayah_n > 1:
+        return surah_n, ayah_n - 1
+    if surah_n > 1:
+        return surah_n - 1, ayah_count(surah_n - 1)
+    return None
@@ -0,0 +1,93 @@
+"""
+Поиск сур для inline-режима: «36», «2:255», «yasin», «ясин», «يس».
+Индекс названий строится в памяти из локального индекса сур (quran_index),
+поэтому запрос на каждое нажатие клавиши не ходит в БД.
+
+Кириллица транслитерируется в латиницу, артикль «al-»/«ال» отбрасывается,
+огласовки и формы алифа нормализуются, повторы букв схлопываются — так «бакара», «Baqara» и «Al-Baqarah»
+приводятся к одному ключу. Опечатки ловит difflib по тем же ключам.
+"""
+import difflib
+import re
+from bisect import bisect_left
+
+from services.quran_index import all_surahs
+from services.quran_meta import is_valid_ayah, is_valid_surah
+
+MAX_RESULTS = 10
+FUZZY_CUTOFF = 0.75
+
+_CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo",
+    "ж": "j", "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m",
+    "н": "n", "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u",
+    "ф": "f", "х": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "",
+    "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    # узбекская кириллица
+    "ў": "o", "қ": "k", "ғ": "g", "ҳ": "h",
+}
+_LATIN = str.maketrans({"q": "k", "x": "h", "أ": "ا", "إ": "ا", "آ": "ا", "ة": "ه", "ى": "ي"})
+_ARTICLE = re.compile(r"^(a[lnrstdz]|an|ash|adh)[-\s'’]+")
+_AYAH_REF = re.compile(r"^(\d{1,3})\s*[:.\s]\s*(\d{1,3})$")
+
+_keys: list[str] = []                   # отсортированные ключи для поиска по префиксу
+_surah_by_key: dict[str, set[int]] = {}
+
+
+def normalize(text: str) -> str:
+    text = "".join(_CYRILLIC.get(ch, ch) for ch in text.lower().strip())
+    text = text.replace("kh", "h")
+    text = _ARTICLE.sub("", text)
+    text = "".join(ch for ch in text if ch.isalnum()).translate(_LATIN)
+    if text.startswith("ال") and len(text) > 3:
+        text = text[2:]
+    return re.sub(r"(.)\1+", r"\1", text)
+
+
+def build_index() -> None:
+    """Перестраивает индекс названий (после quran_index.load_index)."""
+    global _keys
+    _surah_by_key.clear()
+    for meta in all_surahs():
+        for name in (meta.name, meta.name_arabic, meta.name_translation):
+            key = normalize(name)
+            if key:
+                _surah_by_key.setdefault(key, set()).add(meta.number)
+    _keys = sorted(_surah_by_key)
+
+
+def search(query: str) -> list[tuple[int, int | None]]:
+    """Список (сура, аят | None) по запросу, лучшие совпадения первыми."""
+    query = query.strip()
+    if query.isdigit():
+        return [(int(query), None)] if is_valid_surah(int(query)) else []
+
+    ref = _AYAH_REF.match(query)
+    if ref:
+        surah_n, ayah_n = int(ref[1]), int(ref[2])
+        valid = is_valid_surah(surah_n) and is_valid_ayah(surah_n, ayah_n)
+        return [(surah_n, ayah_n)] if valid else []
+
+    key = normalize(query)
+    if not key:
+        return []
+
+    found: list[int] = []
+
+    def add(numbers) -> None:
+        for n in sorted(numbers):
+            if n not in found:
+                found.append(n)
+
+    if key in _surah_by_key:
+        add(_surah_by_key[key])
+    # Префикс: ключи в отсортированном списке идут подряд
+    i = bisect_left(_keys, key)
+    while i < len(_keys) and _keys[i].startswith(key) and len(found) < MAX_RESULTS:
+        add(_surah_by_key[_keys[i]])
+        i += 1
+    if len(found) < MAX_RESULTS:
+        for k in difflib.get_close_matches(key, _keys, n=MAX_RESULTS, cutoff=FUZZY_CUTOFF):
+            add(_surah_by_key[k])
+
+    return [(n, None) for n in found[:MAX_RESULTS]]
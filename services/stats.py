@@ -0,0 +1,59 @@
+"""
+Снимок статистики для /stats.
+Агрегаты по всем пользователям дорогие, поэтому считаем их в фоне раз в
+STATS_REFRESH_INTERVAL секунд, а /stats отдаёт готовый снимок с его временем.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from config import STATS_REFRESH_INTERVAL
+from database.db import get_db
+from database.models import get_stats
+
+logger = logging.getLogger(__name__)
+
+_snapshot: dict | None = None
+_taken_at: float = 0.0
+_taken_dt: datetime | None = None
+_task: asyncio.Task | None = None
+
+
+async def refresh() -> None:
+    global _snapshot, _taken_at, _taken_dt
+    _snapshot = await get_stats(await get_db())
+    _taken_at = time.monotonic()
+    _taken_dt = datetime.now()
+
+
+async def get_snapshot(force: bool = False) -> tuple[dict, datetime, int]:
+    """Снимок, время его построения и возраст в секундах."""
+    # Фоновый пересчёт идёт только на лидере — на остальных воркерах
+    # обновляем устаревший снимок по запросу
+    stale = _task is None and time.monotonic() - _taken_at > STATS_REFRESH_INTERVAL
+    if force or stale or _snapshot is None:
+        await refresh()
+    return _snapshot, _taken_dt, int(time.monotonic() - _taken_at)
+
+
+async def _loop() -> None:
+    while True:
+        try:
+            await refresh()
+        except Exception:
+            logger.exception("stats: refresh failed")
+        await asyncio.sleep(STATS_REFRESH_INTERVAL)
+
+
+def start() -> None:
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_loop())
+
+
+def stop() -> None:
+    global _task
+    if _task:
+        _task.cancel()
+        _task = None
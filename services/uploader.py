@@ -1,50 +1,287 @@
 """
-Pyrogram user-client для загрузки аудио в storage-канал.
+Pyrogram user-клиенты для загрузки аудио в storage-канал.
 User-сессия снимает ограничение Bot API в 50 МБ (лимит до 2 ГБ).
-Файлы скачиваются стримингом на диск — не грузят RAM.
+Аккаунтов может быть несколько (EXTRA_PHONES) — загрузки распределяются между ними.
+
+stream_audio() загружает файл в Telegram по мере скачивания (части по 512 КБ
+прямо из HTTP-ответа), не дожидаясь конца загрузки и без временного файла.
+Если размер источника неизвестен — старый путь через файл на диске.
 """
+import asyncio
+import logging
+import math
 import os
 import tempfile
+import time
+from dataclasses import dataclass
+from hashlib import md5
+
 import aiohttp
-from pyrogram import Client
-from config import API_ID, API_HASH, PHONE, STORAGE_CHANNEL_ID
+from pyrogram import Client, raw
+from pyrogram.errors import FloodWait
+from config import (
+    API_ID, API_HASH, UPLOADER_PHONES, STORAGE_CHANNEL_ID, STREAM_UPLOADS, UPLOAD_WORKERS, WORKER_ID,
+)
+import tracing
+from metrics import DOWNLOAD_TIME, UPLOAD_TIME, UPLOADS, Gauge
+from services.http import get_session
+
+logger = logging.getLogger(__name__)
+
+PART_SIZE       = 512 * 1024          # размер части MTProto-загрузки
+BIG_FILE_SIZE   = 10 * 1024 * 1024    # больше — SaveBigFilePart
+PARTS_IN_FLIGHT = 4                   # частей, загружаемых параллельно
+HEALTH_CHECK_INTERVAL = 60           # сек между проверками сессий
+
+
+class StreamSource:
+    """HTTP-ответ известного размера, который читается по мере скачивания."""
+
+    def __init__(self, response: aiohttp.ClientResponse, size: int, name: str) -> None:
+        self.response = response
+        self.size     = size
+        self.name     = name
+
+
+class _UploaderClient(Client):
+    async def save_file(self, path, file_id=None, file_part=0, progress=None, progress_args=()):
+        if not isinstance(path, StreamSource):
+            return await super().save_file(path, file_id, file_part, progress, progress_args)
+        if file_id is not None:
+            # FilePartMissing: поток уже прочитан, повторить часть нельзя
+            raise IOError(f"stream part {file_part} expired")
+        return await self._save_stream(path)
+
+    async def _save_stream(self, src: StreamSource):
+        total_parts = math.ceil(src.size / PART_SIZE)
+        is_big      = src.size > BIG_FILE_SIZE
+        file_id     = self.rnd_id()
+        md5_sum     = md5() if not is_big else None
+        slots       = asyncio.Semaphore(PARTS_IN_FLIGHT)
+        pending: set[asyncio.Task] = set()
+
+        async def send_part(part: int, data: bytes) -> None:
+            try:
+                if is_big:
+                    rpc = raw.functions.upload.SaveBigFilePart(
+                        file_id=file_id, file_part=part,
+                        file_total_parts=total_parts, bytes=data,
+                    )
+                else:
+                    rpc = raw.functions.upload.SaveFilePart(
+                        file_id=file_id, file_part=part, bytes=data,
+                    )
+                await self.invoke(rpc)
+            finally:
+                slots.release()
+
+        async def submit(part: int, data: bytes) -> None:
+            await slots.acquire()
+            for task in [t for t in pending if t.done()]:
+                pending.discard(task)
+                task.result()  # пробрасываем ошибку загрузки части
+            if md5_sum:
+                md5_sum.update(data)
+            pending.add(asyncio.create_task(send_part(part, data)))
+
+        part = 0
+        buf  = bytearray()
+        try:
+            async for chunk in src.response.content.iter_chunked(64 * 1024):
+                buf += chunk
+                while len(buf) >= PART_SIZE:
+                    await submit(part, bytes(buf[:PART_SIZE]))
+                    del buf[:PART_SIZE]
+                    part += 1
+            if buf:
+                await submit(part, bytes(buf))
+                part += 1
+            await asyncio.gather(*pending)
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            raise
 
-_client: Client | None = None
+        if part != total_parts:
+            raise IOError(f"stream size mismatch: got {part} parts, expected {total_parts}")
 
+        if is_big:
+            return raw.types.InputFileBig(id=file_id, parts=total_parts, name=src.name)
+        return raw.types.InputFile(
+            id=file_id, parts=total_parts, name=src.name, md5_checksum=md5_sum.hexdigest(),
+        )
+
+
+# ─── пул user-сессий ────────────────────────────────────────────────────────
+# Несколько аккаунтов — несколько независимых лимитов MTProto. Загрузка идёт
+# через наименее занятую сессию; сессия под FloodWait временно выводится из
+# ротации, недоступная по health-check — до следующей успешной проверки.
+
+@dataclass
+class _Session:
+    name: str
+    client: _UploaderClient
+    busy: int = 0
+    uploads: int = 0
+    flood_until: float = 0.0
+    healthy: bool = True
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.flood_until <= time.monotonic()
+
+
+_sessions: list[_Session] = []
+_health_task: asyncio.Task | None = None
+_upload_slots = asyncio.Semaphore(UPLOAD_WORKERS)  # общий лимит одновременных загрузок
 
-async def get_client() -> Client:
-    global _client
-    if _client is None:
-        _client = Client(
-            name="quran_user",
+
+def _session_name(index: int) -> str:
+    # Первая сессия сохраняет старое имя файла, чтобы не логиниться заново.
+    # У каждого воркера (WORKER_ID) свои файлы сессий — SQLite Pyrogram'а
+    # нельзя открывать из нескольких процессов.
+    base = f"quran_user_w{WORKER_ID}" if WORKER_ID else "quran_user"
+    return base if index == 0 else f"{base}_{index + 1}"
+
+
+async def start_clients() -> None:
+    """Запускает все user-сессии (может запросить код из SMS при первом запуске)."""
+    global _health_task
+    if _sessions:
+        return
+    for i, phone in enumerate(UPLOADER_PHONES):
+        name   = _session_name(i)
+        client = _UploaderClient(
+            name=name,
             api_id=API_ID,
             api_hash=API_HASH,
-            phone_number=PHONE,
+            phone_number=phone,
         )
-        await _client.start()
-        async for _ in _client.get_dialogs():
-            pass
-    return _client
+        try:
+            await client.start()
+            # Прогреваем кэш peer'ов, иначе storage-канал не резолвится
+            async for _ in client.get_dialogs():
+                pass
+        except Exception:
+            logger.exception("uploader: session %s failed to start", name)
+            continue
+        _sessions.append(_Session(name=name, client=client))
+
+    if not _sessions:
+        raise RuntimeError("uploader: no Pyrogram session could be started")
+    logger.info("uploader: %d session(s) ready", len(_sessions))
+    _health_task = asyncio.create_task(_health_loop())
+
+
+async def stop_clients() -> None:
+    global _health_task
+    if _health_task:
+        _health_task.cancel()
+        _health_task = None
+    for s in _sessions:
+        if s.client.is_connected:
+            await s.client.stop()
+    _sessions.clear()
 
 
-async def stop_client() -> None:
-    global _client
-    if _client and _client.is_connected:
-        await _client.stop()
-        _client = None
+async def _health_loop() -> None:
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+        for s in _sessions:
+            try:
+                await asyncio.wait_for(s.client.get_me(), timeout=15)
+                if not s.healthy:
+                    logger.info("uploader: session %s is back", s.name)
+                s.healthy = True
+            except FloodWait as e:
+                s.flood_until = time.monotonic() + e.value
+            except Exception as e:
+                if s.healthy:
+                    logger.warning("uploader: session %s unhealthy: %s", s.name, e)
+                s.healthy = False
 
 
-async def download_to_tempfile(url: str) -> str:
-    """Скачивает URL чанками (1 МБ) во временный файл. Возвращает путь."""
+def pool_status() -> list[dict]:
+    now = time.monotonic()
+    return [
+        {
+            "name":    s.name,
+            "busy":    s.busy,
+            "uploads": s.uploads,
+            "healthy": s.healthy,
+            "flood":   max(0, int(s.flood_until - now)),
+        }
+        for s in _sessions
+    ]
+
+
+Gauge("uploader_sessions_busy", "Uploads in progress per Pyrogram session", lambda: {
+    (("session", s.name),): s.busy for s in _sessions
+})
+
+
+async def _with_session(send, retry: bool = True):
+    """Выполняет send(client) на наименее занятой доступной сессии.
+    При FloodWait сессия выводится из ротации; если retry — пробуем другую."""
+    async with _upload_slots:
+        return await _pick_and_send(send, retry)
+
+
+async def _pick_and_send(send, retry: bool):
+    last_flood: FloodWait | None = None
+    tried: set[str] = set()
+    while True:
+        candidates = [s for s in _sessions if s.available and s.name not in tried]
+        if not candidates:
+            if last_flood:
+                raise last_flood
+            # Все здоровые сессии под FloodWait — это FloodWait, а не отказ:
+            # вызывающий (prewarm) подождёт, сколько осталось до ближайшей
+            flooded = [s.flood_until for s in _sessions if s.healthy and s.name not in tried]
+            if flooded:
+                raise FloodWait(value=max(1, math.ceil(min(flooded) - time.monotonic())))
+            raise RuntimeError("uploader: no available Pyrogram session")
+
+        s = min(candidates, key=lambda x: x.busy)
+        s.busy += 1
+        try:
+            result = await send(s.client)
+            s.uploads += 1
+            return result
+        except FloodWait as e:
+            s.flood_until = time.monotonic() + e.value
+            logger.warning("uploader: session %s FloodWait %ss", s.name, e.value)
+            if not retry:
+                raise
+            last_flood = e
+            tried.add(s.name)
+        finally:
+            s.busy -= 1
+
+
+async def _timed_upload(mode: str, send, retry: bool = True):
+    """_with_session с учётом длительности и исхода загрузки в метриках."""
+    try:
+        with UPLOAD_TIME.time(mode=mode), tracing.span("mtproto", f"upload {mode}"):
+            result = await _with_session(send, retry=retry)
+    except BaseException:
+        UPLOADS.inc(mode=mode, result="error")
+        raise
+    UPLOADS.inc(mode=mode, result="ok")
+    return result
+
+
+async def _write_tempfile(resp: aiohttp.ClientResponse) -> str:
     tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=300)) as resp:
-                resp.raise_for_status()
-                async for chunk in resp.content.iter_chunked(1024 * 1024):
-                    tmp.write(chunk)
-    finally:
+        with DOWNLOAD_TIME.time():
+            async for chunk in resp.content.iter_chunked(1024 * 1024):
+                tmp.write(chunk)
+    except BaseException:
         tmp.close()
+        os.unlink(tmp.name)
+        raise
+    tmp.close()
     return tmp.name
 
 
@@ -58,15 +295,49 @@ async def upload_audio(
     Загружает аудио из файла на диске в storage-канал через user-сессию.
     Возвращает file_id загруженного сообщения.
     """
-    client = await get_client()
     try:
-        msg = await client.send_audio(
+        msg = await _timed_upload("file", lambda client: client.send_audio(
             chat_id=STORAGE_CHANNEL_ID,
             audio=filepath,
             file_name=filename,
             title=title,
             performer=performer,
-        )
+        ))
     finally:
         os.unlink(filepath)  # удаляем temp файл после загрузки
     return msg.audio.file_id
+
+
+async def stream_audio(
+    url: str,
+    filename: str,
+    title: str = "",
+    performer: str = "",
+) -> str:
+    """
+    Скачивает URL и одновременно загружает его в storage-канал.
+    Без Content-Length (или со сжатием) — через временный файл.
+    Возвращает file_id загруженного сообщения.
+    """
+    session = await get_session()
+    # total не ограничиваем: загрузка идёт в темпе Telegram, следим за простоем чтения
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+    async with session.get(url, timeout=timeout) as resp:
+        resp.raise_for_status()
+        size = resp.content_length
+        encoding = resp.headers.get("Content-Encoding", "identity")
+
+        if not STREAM_UPLOADS or not size or encoding != "identity":
+            filepath = await _write_tempfile(resp)
+        else:
+            # Поток читается один раз — повторить на другой сессии нельзя
+            msg = await _timed_upload("stream", lambda client: client.send_audio(
+                chat_id=STORAGE_CHANNEL_ID,
+                audio=StreamSource(resp, size, filename),
+                file_name=filename,
+                title=title,
+                performer=performer,
+            ), retry=False)
+            return msg.audio.file_id
+
+    return await upload_audio(filepath, filename, title=title, performer=performer)
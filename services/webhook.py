@@ -0,0 +1,50 @@
+"""
+Webhook-режим: обработчик обновлений Telegram монтируется в aiohttp-приложение
+мини-аппа. Обновления принимаются в фоне (Telegram сразу получает 200),
+при остановке сервер дожидается обработки уже принятых обновлений.
+"""
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET
+
+logger = logging.getLogger(__name__)
+
+SHUTDOWN_TIMEOUT = 30  # сек на завершение обработки принятых обновлений
+
+
+class _GracefulRequestHandler(SimpleRequestHandler):
+    async def close(self) -> None:
+        pending = self._background_feed_update_tasks
+        if pending:
+            logger.info("webhook: waiting for %d update(s) to finish", len(pending))
+            await asyncio.wait(pending, timeout=SHUTDOWN_TIMEOUT)
+        await super().close()
+
+
+def is_enabled() -> bool:
+    return bool(WEBHOOK_URL)
+
+
+def setup_webhook(app: web.Application, dp: Dispatcher, bot: Bot) -> None:
+    """Регистрирует POST WEBHOOK_PATH с проверкой X-Telegram-Bot-Api-Secret-Token."""
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("WEBHOOK_SECRET must be set when WEBHOOK_URL is used")
+    _GracefulRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(
+        app, path=WEBHOOK_PATH,
+    )
+    setup_application(app, dp, bot=bot)
+
+
+async def set_webhook(bot: Bot, dp: Dispatcher) -> None:
+    url = WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH
+    await bot.set_webhook(
+        url,
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logger.info("Webhook set to %s", url)
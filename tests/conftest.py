@@ -0,0 +1,16 @@
+"""
+config.py требует переменные окружения при импорте — для тестов хватает
+заглушек; БД и Telegram в модульных тестах не используются.
+"""
+import os
+
+for _name, _value in {
+    "BOT_TOKEN":          "123456:TEST",
+    "DATABASE_URL":       "postgresql://localhost/test",
+    "API_ID":             "1",
+    "API_HASH":           "test",
+    "PHONE":              "+10000000000",
+    "STORAGE_CHANNEL_ID": "-1000000000001",
+    "ADMIN_ID":           "1",
+}.items():
+    os.environ.setdefault(_name, _value)
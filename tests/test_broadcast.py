@@ -0,0 +1,118 @@
+import asyncio
+import random
+import time
+
+from services.broadcast import Broadcast, TokenBucket
+
+
+def _broadcast(last_user_id: int = 0) -> Broadcast:
+    return Broadcast(bot=None, state={
+        "id": 1, "text": "hi", "src_chat_id": None, "src_message_id": None,
+        "status_chat_id": 1, "status_message_id": 1, "total": 0,
+        "sent": 0, "blocked": 0, "failed": 0, "last_user_id": last_user_id,
+    })
+
+
+def test_cursor_waits_for_the_oldest_unfinished_user():
+    b = _broadcast()
+    b._issued.extend([10, 20, 30, 40])
+    b._mark_finished(20)
+    assert b.cursor == 0
+    b._mark_finished(10)
+    assert b.cursor == 20
+    b._mark_finished(40)
+    assert b.cursor == 20
+    b._mark_finished(30)
+    assert b.cursor == 40
+    assert not b._issued and not b._finished
+
+
+def test_cursor_never_passes_an_unfinished_user():
+    rng = random.Random(7)
+    for _ in range(200):
+        b     = _broadcast(last_user_id=5)
+        users = sorted(rng.sample(range(6, 1000), 30))
+        b._issued.extend(users)
+        done: set[int] = set()
+        for user_id in rng.sample(users, len(users)):
+            b._mark_finished(user_id)
+            done.add(user_id)
+            # Всё, что <= курсора, обработано; следующий за курсором — ещё нет
+            assert all(u in done for u in users if u <= b.cursor)
+            pending = [u for u in users if u not in done]
+            assert not pending or b.cursor < pending[0]
+        assert b.cursor == users[-1]
+
+
+def test_token_bucket_limits_rate_after_burst():
+    async def scenario() -> float:
+        bucket  = TokenBucket(rate=100, burst=5)
+        started = time.monotonic()
+        for _ in range(25):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # 5 токенов сразу, остальные 20 — по 100 в секунду
+    assert 0.18 <= asyncio.run(scenario()) < 0.5
+
+
+def test_token_bucket_burst_is_immediate():
+    async def scenario() -> float:
+        bucket  = TokenBucket(rate=1, burst=10)
+        started = time.monotonic()
+        for _ in range(10):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 0.05
+
+
+def test_cancel_mid_send_keeps_unsent_users_after_cursor(monkeypatch):
+    from services import broadcast
+
+    saved: list[int] = []
+    sent:  set[int]  = set()
+
+    async def get_db():
+        return None
+
+    async def iter_active_user_ids(db, after=0):
+        for user_id in range(after + 1, 21):
+            yield user_id
+
+    async def save_broadcast_progress(db, broadcast_id, last_user_id, *counts, done=False):
+        saved.append(last_user_id)
+
+    async def flush():
+        pass
+
+    class Bot:
+        async def send_message(self, user_id, text, **kwargs):
+            if user_id > 3:
+                await asyncio.Event().wait()   # «висящая» отправка
+            sent.add(user_id)
+
+        async def edit_message_text(self, *args, **kwargs):
+            pass
+
+    monkeypatch.setattr(broadcast, "get_db", get_db)
+    monkeypatch.setattr(broadcast, "iter_active_user_ids", iter_active_user_ids)
+    monkeypatch.setattr(broadcast, "save_broadcast_progress", save_broadcast_progress)
+    monkeypatch.setattr(broadcast.blocked, "flush", flush)
+
+    async def scenario() -> None:
+        b    = _broadcast()
+        b.bot = Bot()
+        task = asyncio.create_task(b.run())
+        while len(sent) < 3 or b._queue.empty():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+    unsent = min(u for u in range(1, 21) if u not in sent)
+    assert saved and saved[-1] < unsent
+    assert saved[-1] == 3
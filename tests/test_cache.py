@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+from database import cache, models
+from database.cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    c = LRUCache(maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1       # "b" становится самым старым
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.get("c") == 3
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    c = LRUCache(maxsize=10, ttl=5)
+    c.set("k", "v")
+    now[0] += 5
+    assert c.get("k") == "v"
+    now[0] += 0.1
+    assert c.get("k") is None
+    assert len(c) == 0
+    assert c.stats() == {"size": 0, "hits": 1, "misses": 1}
+
+
+def test_zero_ttl_never_expires(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    c = LRUCache(maxsize=10)
+    c.set("k", "v")
+    now[0] += 10 ** 9
+    assert c.get("k") == "v"
+
+
+class _FakeDb:
+    """Считает обращения к БД; fetchrow отдаёт заранее заданную строку."""
+
+    def __init__(self, row=None) -> None:
+        self.row   = row
+        self.calls = 0
+
+    async def fetchrow(self, *args):
+        self.calls += 1
+        return self.row
+
+    async def execute(self, *args):
+        self.calls += 1
+
+
+def test_get_cached_hits_memory_after_first_lookup(monkeypatch):
+    monkeypatch.setattr(models, "audio_cache", LRUCache(maxsize=10))
+    db  = _FakeDb({"file_id": "f", "caption_ru": "", "caption_uz": "", "title": "", "performer": ""})
+    got = [asyncio.run(models.get_cached(db, "1", 36, None)) for _ in range(3)]
+    assert got[0]["file_id"] == "f" and got.count(got[0]) == 3
+    assert db.calls == 1
+
+
+def test_misses_are_not_cached(monkeypatch):
+    # Промах мог случиться до загрузки — следующий запрос обязан сходить в БД
+    monkeypatch.setattr(models, "audio_cache", LRUCache(maxsize=10))
+    db = _FakeDb(None)
+    assert asyncio.run(models.get_cached(db, "1", 36, None)) is None
+    assert asyncio.run(models.get_cached(db, "1", 36, None)) is None
+    assert db.calls == 2
+
+
+def test_save_to_cache_writes_through(monkeypatch):
+    monkeypatch.setattr(models, "audio_cache", LRUCache(maxsize=10))
+    db = _FakeDb(None)
+    asyncio.run(models.save_to_cache(db, "1", 2, 255, "f", "ru", "uz", "t", "p"))
+    row = asyncio.run(models.get_cached(db, "1", 2, 255))
+    assert row["file_id"] == "f" and row["caption_uz"] == "uz"
+    assert db.calls == 1   # только INSERT
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from services import jobs
+
+
+@pytest.fixture(autouse=True)
+def clean_queue():
+    yield
+    jobs.stop()
+    jobs._jobs.clear()
+    jobs._running = 0
+
+
+async def _occupy_workers() -> asyncio.Event:
+    """Занимает все воркеры задачами, которые ждут gate."""
+    gate = asyncio.Event()
+    for i in range(jobs.DOWNLOAD_WORKERS):
+        asyncio.create_task(jobs.submit(0, f"busy{i}", gate.wait))
+    while jobs._running < jobs.DOWNLOAD_WORKERS:
+        await asyncio.sleep(0)
+    return gate
+
+
+def _recorder(started: list, key: str):
+    async def load() -> str:
+        started.append(key)
+        return key
+    return load
+
+
+SUBMITS = [(1, "a1"), (1, "a2"), (1, "a3"), (2, "b1"), (2, "b2"), (3, "c1")]
+
+
+def test_jobs_of_different_owners_are_taken_round_robin():
+    async def scenario() -> list[str]:
+        gate    = await _occupy_workers()
+        started = []
+        waits   = [asyncio.create_task(jobs.submit(o, k, _recorder(started, k))) for o, k in SUBMITS]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*waits)
+        return started
+
+    assert asyncio.run(scenario()) == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_position_matches_the_order_jobs_start():
+    async def scenario() -> dict[str, int]:
+        await _occupy_workers()
+        for owner, key in SUBMITS:
+            asyncio.create_task(jobs.submit(owner, key, _recorder([], key)))
+        await asyncio.sleep(0)
+        return {key: jobs._position(jobs._jobs[key]) for _, key in SUBMITS}
+
+    positions = asyncio.run(scenario())
+    order = ["a1", "b1", "c1", "a2", "b2", "a3"]
+    assert positions == {key: i + 1 for i, key in enumerate(order)}
+
+
+def test_on_queued_reports_position_when_workers_are_busy():
+    async def scenario() -> list[int]:
+        gate     = await _occupy_workers()
+        reported = []
+
+        async def on_queued(position: int) -> None:
+            reported.append(position)
+
+        wait = asyncio.create_task(jobs.submit(1, "x", _recorder([], "x"), on_queued=on_queued))
+        await asyncio.sleep(0)
+        gate.set()
+        await wait
+        return reported
+
+    assert asyncio.run(scenario()) == [1]
+
+
+def test_same_key_is_loaded_once():
+    async def scenario() -> tuple[list, list]:
+        started = []
+        results = await asyncio.gather(
+            jobs.submit(1, "k", _recorder(started, "k")),
+            jobs.submit(2, "k", _recorder(started, "k")),
+        )
+        return started, results
+
+    started, results = asyncio.run(scenario())
+    assert started == ["k"]
+    assert results == ["k", "k"]
+
+
+def test_full_queue_rejects_new_keys(monkeypatch):
+    async def scenario() -> None:
+        await _occupy_workers()   # выполняющиеся задачи в глубину очереди не входят
+        monkeypatch.setattr(jobs, "JOB_MAX_DEPTH", 2)
+        for key in ("q1", "q2"):
+            asyncio.create_task(jobs.submit(1, key, _recorder([], key)))
+        await asyncio.sleep(0)
+        with pytest.raises(jobs.QueueFull):
+            await jobs.submit(1, "q3", _recorder([], "q3"))
+
+    asyncio.run(scenario())
+
+
+def test_stop_cancels_waiters_of_queued_jobs():
+    async def scenario() -> None:
+        await _occupy_workers()
+        wait = asyncio.create_task(jobs.submit(1, "queued", _recorder([], "queued")))
+        await asyncio.sleep(0)
+        jobs.stop()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(wait, timeout=1)
+        assert jobs.depth() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,59 @@
+import pytest
+
+from services import quran_search
+from services.quran_index import SurahMeta
+from services.quran_search import normalize, search
+
+SURAHS = [
+    SurahMeta(2,   "Al-Baqarah", "البقرة", "The Cow", 286),
+    SurahMeta(36,  "Ya-Sin",     "يس",     "Ya Sin", 83),
+    SurahMeta(67,  "Al-Mulk",    "الملك",  "The Sovereignty", 30),
+    SurahMeta(112, "Al-Ikhlas",  "الإخلاص", "Sincerity", 4),
+]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    """Индекс из нескольких сур вместо загруженного из БД."""
+    monkeypatch.setattr(quran_search, "all_surahs", lambda: SURAHS)
+    monkeypatch.setattr(quran_search, "_keys", [])
+    monkeypatch.setattr(quran_search, "_surah_by_key", {})
+    quran_search.build_index()
+
+
+@pytest.mark.parametrize("variants", [
+    ("бакара", "Baqara", "al baqara", "Al-Baqara"),
+    ("ясин", "Yasin", "Ya-Sin", "YASIN"),
+    ("мульк", "Al-Mulk", "mulk"),
+    ("ихлас", "Al-Ikhlas", "ikhlas", "ixlas"),
+])
+def test_spellings_share_one_key(variants):
+    assert len({normalize(v) for v in variants}) == 1
+
+
+def test_short_spelling_is_a_prefix_of_the_full_name():
+    # Поиск идёт по префиксу ключа — «бакара» находит «Al-Baqarah»
+    assert normalize("Al-Baqarah").startswith(normalize("бакара"))
+
+
+def test_arabic_article_and_letter_forms():
+    assert normalize("البقرة") == normalize("بقره")
+    assert normalize("الإخلاص") == normalize("اخلاص")
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("36",      [(36, None)]),
+    ("2:255",   [(2, 255)]),
+    ("2 255",   [(2, 255)]),
+    ("115",     []),
+    ("2:287",   []),
+    ("ясин",    [(36, None)]),
+    ("بقره",    [(2, None)]),
+    ("bak",     [(2, None)]),   # префикс
+    ("ikhlass", [(112, None)]),
+    ("mulkk",   [(67, None)]),
+    ("sovereinty", [(67, None)]),  # опечатка — difflib
+    ("zzz",     []),
+])
+def test_search(index, query, expected):
+    assert search(query) == expected
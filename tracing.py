@@ -0,0 +1,71 @@
+"""
+Трассировка обработки обновлений: span на всё обновление и вложенные span'ы
+для запросов к БД, HTTP-запросов и вызовов Telegram Bot API.
+
+Текущая трасса лежит в contextvar, поэтому её видят все корутины обработчика
+(и колбэки, запланированные из них). Если трасса не начата — record() и
+span() сразу выходят, так что выключенная трассировка почти ничего не стоит.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+_current: ContextVar["Trace | None"] = ContextVar("trace", default=None)
+
+
+@dataclass
+class Trace:
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: list[tuple[str, str, float]] = field(default_factory=list)  # (вид, что, сек)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self) -> str:
+        """Итог по видам + самые долгие span'ы — для лога медленных обновлений."""
+        totals: dict[str, tuple[int, float]] = {}
+        for kind, _, seconds in self.spans:
+            count, total = totals.get(kind, (0, 0.0))
+            totals[kind] = (count + 1, total + seconds)
+        summary = ", ".join(
+            f"{kind} {count}× {total * 1000:.0f}ms" for kind, (count, total) in totals.items()
+        ) or "no spans"
+        slowest = sorted(self.spans, key=lambda s: s[2], reverse=True)[:5]
+        details = "; ".join(f"{kind} {what} {seconds * 1000:.0f}ms" for kind, what, seconds in slowest)
+        return f"{summary}" + (f" | slowest: {details}" if details else "")
+
+
+def current() -> Trace | None:
+    return _current.get()
+
+
+def start(name: str) -> tuple[Trace, object]:
+    trace = Trace(name)
+    return trace, _current.set(trace)
+
+
+def finish(token) -> None:
+    _current.reset(token)
+
+
+def record(kind: str, what: str, seconds: float) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.spans.append((kind, what, seconds))
+
+
+@contextmanager
+def span(kind: str, what: str) -> Iterator[None]:
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((kind, what, time.perf_counter() - begin))